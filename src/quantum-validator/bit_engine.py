@@ -0,0 +1,116 @@
+"""
+Vectorized bit engine for randomness tests
+
+Converts a sequence of unsigned integers into a packed, big-endian byte buffer
+once, so every bit-level test can share it instead of re-serialising the
+sequence into a Python string. Bit order matches ``format(num, '064b')``: each
+value contributes its bits most-significant first.
+"""
+
+from typing import Sequence, Union
+import numpy as np
+
+# Number of set bits in every possible byte value
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+_DTYPES = {
+    8: np.dtype('>u1'),
+    16: np.dtype('>u2'),
+    32: np.dtype('>u4'),
+    64: np.dtype('>u8'),
+}
+
+
+
+def pack_integers(bits: Union[Sequence[int], np.ndarray], bit_width: int = 64, bit_order: str = "little") -> np.ndarray:
+    """Pack 0/1 values into unsigned integers of ``bit_width`` bits each
+
+    Every consecutive group of ``bit_width`` bits becomes one integer; bits that
+    do not fill a final group are dropped. With ``bit_order="little"`` the first
+    bit of a group is the least significant (bit i is worth 2**i); with
+    ``"big"`` it is the most significant, the order ``BitSequence`` uses, so
+    ``BitSequence.from_numbers(pack_integers(bits, w, "big"), w).bits`` gives
+    the bits back. Returns an array of the matching unsigned dtype.
+    """
+    if bit_width not in _DTYPES:
+        raise ValueError(f"Unsupported bit width {bit_width} (expected 8, 16, 32 or 64)")
+    if bit_order not in ("little", "big"):
+        raise ValueError(f"Unsupported bit order {bit_order!r} (expected 'little' or 'big')")
+
+    bits = np.asarray(bits, dtype=np.uint8)
+    groups = bits[:len(bits) // bit_width * bit_width].reshape(-1, bit_width)
+    packed = np.packbits(groups, axis=1, bitorder=bit_order)
+    # Packing LSB-first fills the least significant byte first, i.e. little-endian bytes
+    dtype = _DTYPES[bit_width].newbyteorder("<" if bit_order == "little" else ">")
+    return packed.view(dtype).ravel().astype(dtype.newbyteorder("="))
+
+class BitSequence:
+    """Bit-level view of an integer sequence, built once and shared by tests"""
+
+    def __init__(self, packed: np.ndarray, n_bits: int):
+        self.packed = packed
+        self.n_bits = n_bits
+        self._bits = None
+        self._ones = None
+
+    @classmethod
+    def from_numbers(cls, sequence: Union[Sequence[int], np.ndarray], bit_width: int = 64) -> "BitSequence":
+        """Build from integers, keeping the low ``bit_width`` bits of each"""
+        if bit_width not in _DTYPES:
+            raise ValueError(f"Unsupported bit width {bit_width} (expected 8, 16, 32 or 64)")
+
+        if isinstance(sequence, np.ndarray) and sequence.dtype.kind in 'ui':
+            values = sequence
+        else:
+            values = np.fromiter(sequence, dtype=np.uint64, count=len(sequence))
+        if bit_width < 64:
+            values = values.astype(np.uint64) & np.uint64((1 << bit_width) - 1)
+
+        packed = values.astype(_DTYPES[bit_width]).view(np.uint8)
+        return cls(packed, packed.size * 8)
+
+    @classmethod
+    def from_bits(cls, bits: Union[Sequence[int], np.ndarray]) -> "BitSequence":
+        """Build from an iterable of 0/1 values"""
+        bits = np.asarray(bits, dtype=np.uint8)
+        sequence = cls(np.packbits(bits), bits.size)
+        sequence._bits = bits
+        return sequence
+
+    @classmethod
+    def coerce(cls, sequence, bit_width: int = 64) -> "BitSequence":
+        """Pass a BitSequence through unchanged, otherwise build one"""
+        if isinstance(sequence, cls):
+            return sequence
+        return cls.from_numbers(sequence, bit_width)
+
+    def __len__(self) -> int:
+        return self.n_bits
+
+    @property
+    def bits(self) -> np.ndarray:
+        """Unpacked bits as a uint8 array of 0s and 1s"""
+        if self._bits is None:
+            self._bits = np.unpackbits(self.packed, count=self.n_bits)
+        return self._bits
+
+    @property
+    def ones(self) -> int:
+        """Total number of set bits (byte-wise popcount)"""
+        if self._ones is None:
+            if self.n_bits == self.packed.size * 8:
+                self._ones = int(POPCOUNT_TABLE[self.packed].sum(dtype=np.int64))
+            else:
+                self._ones = int(np.count_nonzero(self.bits))
+        return self._ones
+
+    @property
+    def zeros(self) -> int:
+        return self.n_bits - self.ones
+
+    def runs(self) -> int:
+        """Number of uninterrupted runs of identical bits"""
+        if self.n_bits == 0:
+            return 0
+        bits = self.bits
+        return 1 + int(np.count_nonzero(bits[1:] != bits[:-1]))
@@ -11,17 +11,24 @@ random number generation for demo purposes.
 For production use with real IBM Quantum hardware, use the full main.py version.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import json
+import os
 import uuid
 import threading
 import time
 import random
 import hashlib
+from array import array
+from contextlib import contextmanager
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs
 import sys
 
+from job_store import job_store_from_env
+
 # Simple statistical functions
 import math
 
@@ -143,8 +150,14 @@ class QuantumSimulator:
             integers.append(random_int)
         
         return integers
+    
+    def generate_quantum_bytes(self, count):
+        """Generate ``count`` quantum random integers as little-endian uint64 bytes"""
+        return random.randbytes(count * 8)
 
 class ValidationJob:
+    PHASES = ("generation", "normalization", "analysis", "comparison")
+    
     def __init__(self, job_id, icp_numbers, quantum_sample_size, use_real_quantum):
         self.job_id = job_id
         self.icp_numbers = icp_numbers
@@ -154,26 +167,78 @@ class ValidationJob:
         self.created_at = datetime.now().isoformat()
         self.completed_at = None
         self.results = {}
+        self.phase = None
+        self.progress = 0.0
+        self.phase_timings = {}
+    
+    @contextmanager
+    def track_phase(self, name):
+        """Time one phase and advance progress once it completes"""
+        self.phase = name
+        start = time.perf_counter()
+        yield
+        self.phase_timings[name] = time.perf_counter() - start
+        self.progress = sum(phase in self.phase_timings for phase in self.PHASES) / len(self.PHASES)
+    
+    def progress_dict(self):
+        return {"phase": self.phase, "progress": self.progress, "phase_timings": self.phase_timings}
+    
+    def to_dict(self):
+        """Stored form of the job; the ICP input is not kept"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "quantum_sample_size": self.quantum_sample_size,
+            "use_real_quantum": self.use_real_quantum,
+            **self.progress_dict(),
+            **self.results
+        }
+    
+    @classmethod
+    def from_dict(cls, record):
+        record = dict(record)
+        job = cls(record.pop("job_id"), [], record.pop("quantum_sample_size", 0), record.pop("use_real_quantum", False))
+        job.status = record.pop("status")
+        job.created_at = record.pop("created_at")
+        job.completed_at = record.pop("completed_at")
+        job.phase = record.pop("phase", None)
+        job.progress = record.pop("progress", 0.0)
+        job.phase_timings = record.pop("phase_timings", {})
+        job.results = record
+        return job
 
-# Global storage
-validation_jobs = {}
+# Global storage, bounded by the JOB_STORE_* environment variables
+validation_jobs = job_store_from_env(to_dict=ValidationJob.to_dict, from_dict=ValidationJob.from_dict)
 quantum_sim = QuantumSimulator()
 stats = SimpleStats()
 
+# Validations run on a bounded pool; submissions beyond the workers plus the
+# queue depth are rejected with 429 instead of piling up threads
+validation_workers = int(os.environ.get("VALIDATION_WORKERS", 4))
+validation_executor = ThreadPoolExecutor(max_workers=validation_workers, thread_name_prefix="validation")
+validation_slots = threading.BoundedSemaphore(validation_workers + int(os.environ.get("VALIDATION_QUEUE_DEPTH", 16)))
+
+# Optional artificial delay per validation, in seconds, for demos; off by default
+inject_latency = float(os.environ.get("DEMO_INJECT_LATENCY", 0))
+
+class ValidationServer(ThreadingHTTPServer):
+    """One thread per connection, with a listen backlog sized for load tests"""
+    request_queue_size = 128
+    daemon_threads = True
+
 class ValidationHandler(BaseHTTPRequestHandler):
+    # Keep-alive lets the frontend reuse one connection for status polling
+    protocol_version = 'HTTP/1.1'
+    # Drop idle keep-alive connections so they do not hold threads forever
+    timeout = 30
+    
     def do_GET(self):
         """Handle GET requests"""
         parsed_url = urlparse(self.path)
         path = parsed_url.path
         
-        # CORS headers
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        
         if path == '/':
             # Health check
             response = {
@@ -187,50 +252,91 @@ class ValidationHandler(BaseHTTPRequestHandler):
         elif path.startswith('/validation-status/'):
             # Get validation status
             job_id = path.split('/')[-1]
-            if job_id in validation_jobs:
-                job = validation_jobs[job_id]
+            job = validation_jobs.get(job_id)
+            if job is not None:
                 response = {
                     "job_id": job.job_id,
                     "status": job.status,
                     "created_at": job.created_at,
                     "completed_at": job.completed_at,
+                    **job.progress_dict(),
                     **job.results
                 }
             else:
                 response = {"error": "Job not found"}
                 
         elif path == '/validation-jobs':
-            # List all jobs
-            response = [
-                {
-                    "job_id": job.job_id,
-                    "status": job.status,
-                    "created_at": job.created_at
-                }
-                for job in validation_jobs.values()
-            ]
+            # List job summaries, newest first
+            query = parse_qs(parsed_url.query)
+            offset = int(query.get('offset', ['0'])[0])
+            limit = min(int(query.get('limit', ['50'])[0]), 500)
+            total, jobs = validation_jobs.list(offset, limit, query.get('status', [None])[0])
+            response = {"total": total, "offset": offset, "limit": limit, "jobs": jobs}
         else:
             response = {"error": "Not found"}
         
-        self.wfile.write(json.dumps(response, indent=2).encode())
+        self.send_json(response, indent=2)
     
-    def do_POST(self):
-        """Handle POST requests"""
-        parsed_url = urlparse(self.path)
-        path = parsed_url.path
-        
-        # CORS headers
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+    def send_headers(self, content_type='application/json', content_length=None, status=200):
+        """Send a response status with CORS headers
+        
+        Without a ``content_length`` the connection is closed after the body,
+        since HTTP/1.1 keep-alive needs the length to find the next request.
+        """
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        if content_length is None:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        else:
+            self.send_header('Content-Length', str(content_length))
         self.end_headers()
+    
+    def send_json(self, response, status=200, indent=None):
+        """Send ``response`` as a complete JSON body"""
+        body = json.dumps(response, indent=indent).encode()
+        self.send_headers(content_length=len(body), status=status)
+        self.wfile.write(body)
+    
+    def stream_quantum_numbers(self, count, output_format, chunk_size=8192):
+        """Write ``count`` numbers as raw uint64 bytes or NDJSON, one chunk at a time"""
+        if output_format == 'binary':
+            self.send_headers('application/octet-stream', content_length=count * 8)
+        else:
+            self.send_headers('application/x-ndjson')
+        remaining = count
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            data = quantum_sim.generate_quantum_bytes(n)
+            if output_format == 'binary':
+                self.wfile.write(data)
+            else:
+                numbers = array('Q', data)
+                if sys.byteorder == 'big':
+                    numbers.byteswap()
+                self.wfile.write(('{"numbers": ' + json.dumps(numbers.tolist()) + '}\n').encode())
+            remaining -= n
+        if output_format == 'ndjson':
+            summary = {"count": count, "source": "quantum_simulation", "timestamp": datetime.now().isoformat()}
+            self.wfile.write((json.dumps(summary) + '\n').encode())
+    
+    def do_POST(self):
+        """Handle POST requests"""
+        parsed_url = urlparse(self.path)
+        path = parsed_url.path
         
         # Read request body
-        content_length = int(self.headers['Content-Length'])
+        content_length = int(self.headers.get('Content-Length', 0))
         post_data = self.rfile.read(content_length)
-        data = json.loads(post_data.decode('utf-8'))
+        data = json.loads(post_data.decode('utf-8') or '{}')
+        
+        if path == '/generate-quantum-random' and data.get('format') in ('binary', 'ndjson'):
+            # Stream without building the whole list or JSON document
+            self.stream_quantum_numbers(data.get('count', 100), data['format'])
+            return
         
         if path == '/generate-quantum-random':
             # Generate quantum random numbers
@@ -248,6 +354,10 @@ class ValidationHandler(BaseHTTPRequestHandler):
             
         elif path == '/validate-randomness':
             # Start validation job
+            if not validation_slots.acquire(blocking=False):
+                self.send_json({"error": "Validation queue is full, retry later"}, status=429)
+                return
+            
             job_id = str(uuid.uuid4())
             icp_numbers = data.get('icp_numbers', [])
             quantum_sample_size = data.get('quantum_sample_size', len(icp_numbers))
@@ -255,16 +365,17 @@ class ValidationHandler(BaseHTTPRequestHandler):
             
             # Create job
             job = ValidationJob(job_id, icp_numbers, quantum_sample_size, use_real_quantum)
-            validation_jobs[job_id] = job
+            validation_jobs.put(job_id, job)
             
             # Start validation in background
-            threading.Thread(target=self.run_validation, args=(job,), daemon=True).start()
+            future = validation_executor.submit(self.run_validation, job)
+            future.add_done_callback(lambda _: validation_slots.release())
             
             response = {"job_id": job_id, "status": "started"}
         else:
             response = {"error": "Not found"}
         
-        self.wfile.write(json.dumps(response, indent=2).encode())
+        self.send_json(response)
     
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
@@ -272,15 +383,18 @@ class ValidationHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def run_validation(self, job):
         """Run validation in background thread"""
         try:
             job.status = "running"
+            validation_jobs.put(job.job_id, job)
             
-            # Simulate processing time
-            time.sleep(2)
+            if inject_latency > 0:
+                with job.track_phase("injected_latency"):
+                    time.sleep(inject_latency)
             
             # Apply consistent hash normalization to both sequences
             def hash_normalize(num):
@@ -302,19 +416,23 @@ class ValidationHandler(BaseHTTPRequestHandler):
                 
                 return abs(hash_val) % 1000000000
             
-            # Normalize ICP numbers (they should already be normalized by frontend, but ensure consistency)
-            normalized_icp = [hash_normalize(n) for n in job.icp_numbers]
+            with job.track_phase("generation"):
+                raw_quantum_numbers = quantum_sim.generate_quantum_integers(job.quantum_sample_size)
             
-            # Generate quantum numbers and apply same normalization
-            raw_quantum_numbers = quantum_sim.generate_quantum_integers(job.quantum_sample_size)
-            normalized_quantum = [hash_normalize(n) for n in raw_quantum_numbers]
+            with job.track_phase("normalization"):
+                # Normalize ICP numbers (they should already be normalized by frontend, but ensure consistency)
+                normalized_icp = [hash_normalize(n) for n in job.icp_numbers]
+                # Apply the same normalization to the quantum numbers
+                normalized_quantum = [hash_normalize(n) for n in raw_quantum_numbers]
             
-            # Analyze both normalized sequences
-            icp_stats = self.analyze_sequence(normalized_icp, "ICP")
-            quantum_stats = self.analyze_sequence(normalized_quantum, "Quantum")
+            with job.track_phase("analysis"):
+                # Analyze both normalized sequences
+                icp_stats = self.analyze_sequence(normalized_icp, "ICP")
+                quantum_stats = self.analyze_sequence(normalized_quantum, "Quantum")
             
-            # Compare sequences using KS test (simplified)
-            ks_p_value = self.simplified_ks_test(normalized_icp, normalized_quantum)
+            with job.track_phase("comparison"):
+                # Compare sequences using KS test (simplified)
+                ks_p_value = self.simplified_ks_test(normalized_icp, normalized_quantum)
             
             comparison_results = {
                 "ks_test_p_value": ks_p_value,
@@ -349,6 +467,12 @@ class ValidationHandler(BaseHTTPRequestHandler):
         except Exception as e:
             job.status = "failed"
             job.results = {"error": str(e)}
+        
+        job.phase = None
+        
+        # The input is no longer needed once the job has finished
+        job.icp_numbers = None
+        validation_jobs.put(job.job_id, job)
     
     def analyze_sequence(self, numbers, name):
         """Analyze a sequence of numbers for randomness"""
@@ -410,15 +534,20 @@ class ValidationHandler(BaseHTTPRequestHandler):
             return 0.02  # Sequences are different
 
 def main():
+    parser = argparse.ArgumentParser(description="ICP Quantum Randomness Validator (Demo)")
+    parser.add_argument("--host", default=os.environ.get("DEMO_HOST", ""), help="Listen address (default: all interfaces)")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("DEMO_PORT", 8000)), help="Listen port")
+    args = parser.parse_args()
+    
     print("🌟 Starting ICP Quantum Randomness Validator (Demo Mode)")
     print("🔬 This is a demonstration version with simulated quantum validation")
     print("⚛️  For real IBM Quantum integration, use the full Qiskit version")
     print()
     
-    server_address = ('', 8000)
-    httpd = HTTPServer(server_address, ValidationHandler)
+    server_address = (args.host, args.port)
+    httpd = ValidationServer(server_address, ValidationHandler)
     
-    print(f"✅ Server running on http://localhost:8000")
+    print(f"✅ Server running on http://{args.host or 'localhost'}:{args.port}")
     print(f"📚 API Documentation available at endpoints:")
     print(f"   GET  /                     - Health check")
     print(f"   POST /validate-randomness  - Start validation") 
@@ -432,7 +561,8 @@ def main():
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n🛑 Shutting down quantum validator...")
-        httpd.shutdown()
+        httpd.server_close()
+        validation_executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,257 @@
+"""
+Bounded storage for validation jobs
+
+``JobStore`` keeps jobs in memory and evicts finished ones by TTL, by count
+(least recently used first) and by an approximate memory cap, so a long-running
+validator no longer accumulates every job it has ever seen. ``SQLiteJobStore``
+adds a local SQLite file underneath, so finished results survive restarts and
+can be paged through without holding them all in memory.
+
+Jobs are stored as-is and converted with the ``to_dict`` / ``from_dict`` pair
+only for sizing, listing and persistence. Callers mutate a job in place and call
+``put`` again to record its new state. Pending and running jobs are never
+evicted; the validation queue already bounds how many of them exist. Listeners
+added with ``add_listener`` are told about every ``put``, which is how state
+changes are pushed to subscribers.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+ACTIVE_STATUSES = ("pending", "running")
+SUMMARY_FIELDS = ("job_id", "status", "created_at", "completed_at", "is_random")
+
+
+class JobStore:
+    """In-memory job store with LRU, TTL and memory-cap eviction"""
+
+    def __init__(
+        self,
+        max_jobs: int = 1000,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        to_dict: Callable[[Any], Dict] = dict,
+        from_dict: Callable[[Dict], Any] = dict,
+    ):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.to_dict = to_dict
+        self.from_dict = from_dict
+        self.evictions = 0
+        self._listeners: List[Callable[[str, Any, Dict], None]] = []
+        # job_id -> [job, summary, size, updated_at], least recently used first
+        self._jobs: "OrderedDict[str, list]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def add_listener(self, listener: Callable[[str, Any, Dict], None]):
+        """Call ``listener(job_id, job, summary)`` after every ``put``"""
+        self._listeners.append(listener)
+
+    def put(self, job_id: str, job: Any):
+        """Insert a job or record its current state"""
+        record = self.to_dict(job)
+        data = json.dumps(record, default=str)
+        summary = {field: record.get(field) for field in SUMMARY_FIELDS}
+        with self._lock:
+            self._store(job_id, job, summary, len(data))
+            self._persist(job_id, summary, data)
+            self._evict()
+        for listener in self._listeners:
+            listener(job_id, job, summary)
+
+    def get(self, job_id: str) -> Optional[Any]:
+        """Return the job, or None if it is unknown or has expired"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None and self._expired(entry, time.time()):
+                self._drop(job_id)
+                entry = None
+            if entry is not None:
+                self._jobs.move_to_end(job_id)
+                return entry[0]
+
+            data = self._load(job_id)
+            if data is None:
+                return None
+            record = json.loads(data)
+            job = self.from_dict(record)
+            self._store(job_id, job, {field: record.get(field) for field in SUMMARY_FIELDS}, len(data))
+            self._evict()
+            return job
+
+    def __getitem__(self, job_id: str) -> Any:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def list(self, offset: int = 0, limit: int = 50, status: Optional[str] = None) -> Tuple[int, List[Dict]]:
+        """Return ``(total, summaries)`` for one page, newest first"""
+        with self._lock:
+            self._evict()
+            return self._page(offset, limit, status)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "jobs": len(self._jobs),
+                "max_jobs": self.max_jobs,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
+
+    # Internals below are called with the lock held
+
+    def _store(self, job_id: str, job: Any, summary: Dict, size: int):
+        previous = self._jobs.pop(job_id, None)
+        if previous is not None:
+            self._bytes -= previous[2]
+        self._jobs[job_id] = [job, summary, size, time.time()]
+        self._bytes += size
+
+    def _drop(self, job_id: str):
+        entry = self._jobs.pop(job_id)
+        self._bytes -= entry[2]
+        self.evictions += 1
+
+    def _expired(self, entry: list, now: float) -> bool:
+        return entry[1]["status"] not in ACTIVE_STATUSES and now - entry[3] > self.ttl_seconds
+
+    def _evict(self):
+        now = time.time()
+        for job_id in [job_id for job_id, entry in self._jobs.items() if self._expired(entry, now)]:
+            self._drop(job_id)
+
+        if len(self._jobs) <= self.max_jobs and self._bytes <= self.max_bytes:
+            return
+        for job_id in [job_id for job_id, entry in self._jobs.items() if entry[1]["status"] not in ACTIVE_STATUSES]:
+            if len(self._jobs) <= self.max_jobs and self._bytes <= self.max_bytes:
+                break
+            self._drop(job_id)
+
+    def _persist(self, job_id: str, summary: Dict, data: str):
+        """Hook for durable backends; the in-memory store keeps nothing else"""
+
+    def _load(self, job_id: str) -> Optional[str]:
+        """Hook for durable backends; returns the serialized job or None"""
+        return None
+
+    def _page(self, offset: int, limit: int, status: Optional[str]) -> Tuple[int, List[Dict]]:
+        summaries = [entry[1] for entry in self._jobs.values() if status is None or entry[1]["status"] == status]
+        summaries.sort(key=lambda summary: summary["created_at"] or "", reverse=True)
+        return len(summaries), summaries[offset:offset + limit]
+
+
+class SQLiteJobStore(JobStore):
+    """Job store persisted to a local SQLite file
+
+    The in-memory store acts as a cache of recently used jobs; every ``put`` is
+    written through to SQLite, so listing and lookups also see jobs the cache
+    has evicted or that were recorded before a restart. Rows older than
+    ``retention_seconds`` are deleted. Jobs left pending or running by a
+    previous process are marked failed on startup.
+    """
+
+    def __init__(self, path: str, retention_seconds: float = 7 * 24 * 3600.0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at TEXT,
+                completed_at TEXT,
+                is_random INTEGER,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)")
+        self._recover()
+        self._db.commit()
+
+    def _recover(self):
+        placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+        rows = self._db.execute(
+            f"SELECT job_id, data FROM jobs WHERE status IN ({placeholders})", ACTIVE_STATUSES
+        ).fetchall()
+        for job_id, data in rows:
+            record = json.loads(data)
+            record["status"] = "failed"
+            record["error"] = "Interrupted by service restart"
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', data = ? WHERE job_id = ?",
+                (json.dumps(record, default=str), job_id),
+            )
+
+    def _persist(self, job_id: str, summary: Dict, data: str):
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, summary["status"], summary["created_at"], summary["completed_at"],
+             summary["is_random"], now, data),
+        )
+        self._db.execute(
+            "DELETE FROM jobs WHERE updated_at < ? AND status NOT IN ('pending', 'running')",
+            (now - self.retention_seconds,),
+        )
+        self._db.commit()
+
+    def _load(self, job_id: str) -> Optional[str]:
+        row = self._db.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def _page(self, offset: int, limit: int, status: Optional[str]) -> Tuple[int, List[Dict]]:
+        where, params = ("WHERE status = ?", (status,)) if status else ("", ())
+        total = self._db.execute(f"SELECT COUNT(*) FROM jobs {where}", params).fetchone()[0]
+        rows = self._db.execute(
+            f"SELECT {', '.join(SUMMARY_FIELDS)} FROM jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            params + (limit, offset),
+        ).fetchall()
+        summaries = [dict(zip(SUMMARY_FIELDS, row)) for row in rows]
+        for summary in summaries:
+            if summary["is_random"] is not None:
+                summary["is_random"] = bool(summary["is_random"])
+        return total, summaries
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            stats["persisted_jobs"] = self._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        stats["path"] = self.path
+        return stats
+
+
+def job_store_from_env(**kwargs) -> JobStore:
+    """Build the store configured by the ``JOB_STORE_*`` environment variables"""
+    options = dict(
+        max_jobs=int(os.environ.get("JOB_STORE_MAX_JOBS", 1000)),
+        ttl_seconds=float(os.environ.get("JOB_STORE_TTL_SECONDS", 3600)),
+        max_bytes=int(os.environ.get("JOB_STORE_MAX_BYTES", 64 * 1024 * 1024)),
+    )
+    options.update(kwargs)
+    path = os.environ.get("JOB_STORE_SQLITE_PATH")
+    if path:
+        return SQLiteJobStore(
+            path,
+            retention_seconds=float(os.environ.get("JOB_STORE_RETENTION_SECONDS", 7 * 24 * 3600)),
+            **options,
+        )
+    return JobStore(**options)
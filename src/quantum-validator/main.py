@@ -10,13 +10,20 @@ Author: ICP VRN Generator Team
 Purpose: Hackathon demonstration of ICP's unique randomness capabilities
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import numpy as np
+import os
 import uuid
 import asyncio
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
 import json
 
@@ -30,6 +37,12 @@ from qiskit.providers.fake_provider import FakeManila
 from scipy import stats
 import pandas as pd
 
+from bit_engine import BitSequence, pack_integers
+from nist_tests import TEST_REGISTRY, run_battery
+from task_graph import TaskGraph
+from job_store import ACTIVE_STATUSES, SUMMARY_FIELDS, job_store_from_env
+from result_cache import ResultCache, result_key
+
 app = FastAPI(
     title="ICP Quantum Randomness Validator",
     description="Validate ICP randomness using IBM Quantum computers",
@@ -51,10 +64,14 @@ class RandomNumberBatch(BaseModel):
     source: str = "icp"
     timestamp: str = None
 
-class ValidationRequest(BaseModel):
-    icp_numbers: List[int]
+class ValidationOptions(BaseModel):
     quantum_sample_size: int = 1000
     use_real_quantum: bool = False
+    full_battery: bool = False  # Also run the NIST SP 800-22 battery
+    refresh_quantum: bool = False  # Regenerate the quantum side even if this input is cached
+
+class ValidationRequest(ValidationOptions):
+    icp_numbers: List[int]
 
 class ValidationResult(BaseModel):
     job_id: str
@@ -66,25 +83,208 @@ class ValidationResult(BaseModel):
     is_random: Optional[bool] = None
     created_at: str
     completed_at: Optional[str] = None
+    queue_position: Optional[int] = None  # 1-based, while waiting for a worker
+    stage_timings: Optional[Dict] = None
+    error: Optional[str] = None
+    cache: Optional[str] = None  # "hit", "partial" (ICP side reused) or "miss"
+
+# Bounded job storage; set JOB_STORE_SQLITE_PATH to keep results across restarts.
+# Validation workers re-import this module but never touch jobs, so only the
+# serving process opens the store (and recovers jobs a restart interrupted).
+validation_jobs = job_store_from_env(
+    to_dict=lambda job: job.model_dump(exclude={"queue_position"}),
+    from_dict=lambda record: ValidationResult(**record),
+) if multiprocessing.parent_process() is None else None
+
+# Results keyed by the ICP input and test configuration, see result_cache.py
+result_cache = ResultCache(
+    max_bytes=int(os.environ.get("RESULT_CACHE_BYTES", 32 << 20)),
+    directory=os.environ.get("RESULT_CACHE_DIR") or None,
+    max_disk_bytes=int(os.environ.get("RESULT_CACHE_DISK_BYTES", 256 << 20)),
+) if multiprocessing.parent_process() is None else None
+
+class CompiledCircuitCache:
+    """Bounded LRU cache of transpiled circuits keyed by (backend, num_qubits)"""
+    
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._circuits: "OrderedDict[tuple, QuantumCircuit]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def backend_key(backend) -> str:
+        """Identify a backend by name (BackendV1 exposes name() as a method)
+        
+        Names are used rather than object identity because ``least_busy``
+        hands back a fresh backend object on every call.
+        """
+        return backend.name() if callable(backend.name) else backend.name
+    
+    def get(self, backend, num_qubits: int, build) -> QuantumCircuit:
+        """Return the compiled circuit for this shape, transpiling on a miss"""
+        key = (self.backend_key(backend), num_qubits)
+        with self._lock:
+            if key in self._circuits:
+                self.hits += 1
+                self._circuits.move_to_end(key)
+                return self._circuits[key]
+            self.misses += 1
+        
+        compiled = transpile(build(num_qubits), backend)
+        
+        with self._lock:
+            self._circuits[key] = compiled
+            self._circuits.move_to_end(key)
+            while len(self._circuits) > self.max_size:
+                self._circuits.popitem(last=False)
+        return compiled
+    
+    def invalidate(self, backend=None):
+        """Drop cached circuits for one backend, or all of them"""
+        with self._lock:
+            if backend is None:
+                self._circuits.clear()
+                return
+            backend_key = self.backend_key(backend)
+            for key in [k for k in self._circuits if k[0] == backend_key]:
+                del self._circuits[key]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._circuits),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
 
-# In-memory storage for validation jobs (in production, use Redis or database)
-validation_jobs: Dict[str, ValidationResult] = {}
+class EntropyPool:
+    """Bounded buffer of pre-sampled quantum bits, stored packed 8 per byte
+    
+    A background task refills the buffer to capacity whenever it drops below
+    the low-water mark, sampling ``refill_chunk_bytes`` every
+    ``refill_interval`` seconds. Bits are packed most-significant first, so
+    unpacking a drawn byte string returns them in their original order.
+    """
+    
+    def __init__(
+        self,
+        capacity_bytes: int = 1 << 20,
+        low_water_bytes: int = 256 << 10,
+        refill_chunk_bytes: int = 64 << 10,
+        refill_interval: float = 0.1,
+    ):
+        self.capacity_bytes = capacity_bytes
+        self.low_water_bytes = min(low_water_bytes, capacity_bytes)
+        self.refill_chunk_bytes = refill_chunk_bytes
+        self.refill_interval = refill_interval
+        self.bytes_served = 0
+        self.bytes_refilled = 0
+        self.fallback_bytes = 0
+        self.refill_errors = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def level(self) -> int:
+        return len(self._buffer)
+    
+    def take(self, num_bytes: int) -> bytes:
+        """Remove and return up to ``num_bytes`` from the front of the pool"""
+        with self._lock:
+            data = bytes(self._buffer[:num_bytes])
+            del self._buffer[:num_bytes]
+            self.bytes_served += len(data)
+            self.fallback_bytes += num_bytes - len(data)
+        return data
+    
+    def put(self, data: bytes):
+        """Append freshly sampled bytes, dropping any overflow past capacity"""
+        with self._lock:
+            room = self.capacity_bytes - len(self._buffer)
+            self._buffer.extend(data[:room])
+            self.bytes_refilled += min(len(data), room)
+    
+    async def run(self, sample_bytes):
+        """Refill loop; ``sample_bytes(n)`` must return ``n`` packed bytes"""
+        while True:
+            if self.level < self.low_water_bytes:
+                self._refilling = True
+            if self._refilling:
+                try:
+                    chunk = min(self.refill_chunk_bytes, self.capacity_bytes - self.level)
+                    if chunk > 0:
+                        self.put(await sample_bytes(chunk))
+                except Exception as e:
+                    self.refill_errors += 1
+                    print(f"Entropy pool refill failed: {e}")
+                if self.level >= self.capacity_bytes:
+                    self._refilling = False
+            await asyncio.sleep(self.refill_interval)
+    
+    def start(self, sample_bytes):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run(sample_bytes))
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "capacity_bytes": self.capacity_bytes,
+            "low_water_bytes": self.low_water_bytes,
+            "fill_bytes": self.level,
+            "fill_level": self.level / self.capacity_bytes if self.capacity_bytes else 0.0,
+            "refill_rate_bytes_per_s": self.refill_chunk_bytes / self.refill_interval,
+            "bytes_served": self.bytes_served,
+            "bytes_refilled": self.bytes_refilled,
+            "fallback_bytes": self.fallback_bytes,
+            "refill_errors": self.refill_errors,
+        }
 
 class QuantumRandomGenerator:
     """Generate quantum random numbers using IBM Quantum or simulator"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        num_qubits: int = 16,
+        max_shots: int = 8192,
+        circuit_cache_size: int = 32,
+        entropy_pool: Optional[EntropyPool] = None,
+    ):
         self.service = None
         self.simulator = AerSimulator()
+        # Register width and shots per job for batched sampling
+        self.num_qubits = num_qubits
+        self.max_shots = max_shots
+        self.circuit_cache = CompiledCircuitCache(circuit_cache_size)
+        self.entropy_pool = entropy_pool or EntropyPool()
         
     async def initialize_ibm_quantum(self, token: str = None):
         """Initialize IBM Quantum service (requires API token)"""
         try:
             if token:
-                self.service = QiskitRuntimeService(channel="ibm_quantum", token=token)
+                service = QiskitRuntimeService(channel="ibm_quantum", token=token)
             else:
                 # Try to use saved credentials
-                self.service = QiskitRuntimeService()
+                service = QiskitRuntimeService()
+            # Hardware circuits were compiled against the previous service's backends
+            if self.service is not None:
+                self.circuit_cache.invalidate()
+            self.service = service
             return True
         except Exception as e:
             print(f"IBM Quantum initialization failed: {e}")
@@ -98,25 +298,105 @@ class QuantumRandomGenerator:
         for i in range(num_qubits):
             qc.h(i)
         
-        # Measure all qubits
-        qc.measure_all()
+        # Measure every qubit into its own classical bit
+        qc.measure(range(num_qubits), range(num_qubits))
         
         return qc
     
-    async def generate_quantum_random_bits(self, count: int, use_real_quantum: bool = False) -> List[int]:
-        """Generate quantum random bits"""
+    @staticmethod
+    def backend_qubit_limit(backend) -> int:
+        """Maximum register width supported by a backend"""
+        try:
+            return backend.configuration().n_qubits
+        except Exception:
+            return backend.num_qubits
+    
+    @staticmethod
+    def memory_to_bits(memory: List[str], num_qubits: int) -> np.ndarray:
+        """Convert per-shot bitstrings into a flat bit array, qubit 0 first.
+        
+        Qiskit reports classical bits most-significant first, so each shot is
+        reversed to keep the same order as the single-shot path.
+        """
+        raw = np.frombuffer(''.join(memory).encode('ascii'), dtype=np.uint8)
+        shots = raw.reshape(-1, num_qubits)[:, ::-1]
+        return (shots - ord('0')).ravel()
+    
+    def compiled_circuit(self, backend, num_qubits: int) -> QuantumCircuit:
+        """Transpiled random circuit for a backend, built once per shape"""
+        return self.circuit_cache.get(backend, num_qubits, self.create_quantum_random_circuit)
+    
+    def _sample_bits_batched(self, count: int, num_qubits: int) -> np.ndarray:
+        """Sample bits on the simulator with one wide circuit and many shots"""
+        backend = self.simulator
+        num_qubits = min(num_qubits, self.backend_qubit_limit(backend))
+        transpiled_qc = self.compiled_circuit(backend, num_qubits)
+        
+        shots_needed = (count + num_qubits - 1) // num_qubits
+        chunks = []
+        while shots_needed > 0:
+            shots = min(shots_needed, self.max_shots)
+            job = backend.run(transpiled_qc, shots=shots, memory=True)
+            chunks.append(self.memory_to_bits(job.result().get_memory(), num_qubits))
+            shots_needed -= shots
+        
+        return np.concatenate(chunks)[:count]
+    
+    async def _sample_pool_bytes(self, num_bytes: int) -> bytes:
+        """Sample packed simulator bits for the entropy pool off the event loop"""
+        bits = await asyncio.to_thread(self._sample_bits_batched, num_bytes * 8, self.num_qubits)
+        return np.packbits(bits).tobytes()
+    
+    def start_entropy_pool(self):
+        """Start background prefetching into the entropy pool"""
+        self.entropy_pool.start(self._sample_pool_bytes)
+    
+    def _draw_pool_bits(self, count: int) -> np.ndarray:
+        """Take up to ``count`` bits from the entropy pool"""
+        data = self.entropy_pool.take((count + 7) // 8)
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8))[:count]
+    
+    async def generate_quantum_random_bits(
+        self,
+        count: int,
+        use_real_quantum: bool = False,
+        batched: bool = True,
+        num_qubits: Optional[int] = None,
+        use_pool: bool = True,
+        as_array: bool = False,
+    ) -> List[int]:
+        """Generate quantum random bits
+        
+        In batched mode the simulator runs a single ``num_qubits``-wide circuit
+        with up to ``max_shots`` shots per job instead of one 8-qubit, single-shot
+        job per 8 bits. Bits are returned in the same qubit order either way.
+        Simulator requests at the default width are served from the entropy
+        pool first and only sample live for whatever the pool cannot cover.
+        ``as_array`` returns a uint8 array instead of a list.
+        """
         try:
+            if count <= 0:
+                return np.empty(0, dtype=np.uint8) if as_array else []
+            
+            if batched and not (use_real_quantum and self.service):
+                bits = np.empty(0, dtype=np.uint8)
+                if use_pool and num_qubits is None:
+                    bits = self._draw_pool_bits(count)
+                if len(bits) < count:
+                    live = self._sample_bits_batched(count - len(bits), num_qubits or self.num_qubits)
+                    bits = np.concatenate([bits, live])
+                return bits if as_array else bits.tolist()
+            
             num_qubits = 8  # Generate 8 bits at a time
             circuits_needed = (count + num_qubits - 1) // num_qubits
             
             all_bits = []
             
             for _ in range(circuits_needed):
-                qc = self.create_quantum_random_circuit(num_qubits)
-                
                 if use_real_quantum and self.service:
                     # Use real IBM Quantum hardware
                     backend = self.service.least_busy(operational=True, simulator=False)
+                    qc = self.compiled_circuit(backend, num_qubits)
                     sampler = Sampler(backend)
                     job = sampler.run([qc], shots=1)
                     result = job.result()
@@ -127,7 +407,7 @@ class QuantumRandomGenerator:
                 else:
                     # Use simulator (faster for development/demo)
                     backend = self.simulator
-                    transpiled_qc = transpile(qc, backend)
+                    transpiled_qc = self.compiled_circuit(backend, num_qubits)
                     job = backend.run(transpiled_qc, shots=1)
                     result = job.result()
                     
@@ -138,44 +418,116 @@ class QuantumRandomGenerator:
                 
                 all_bits.extend(bits)
             
-            return all_bits[:count]  # Return exactly the requested count
+            all_bits = all_bits[:count]  # Return exactly the requested count
+            return np.array(all_bits, dtype=np.uint8) if as_array else all_bits
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Quantum random generation failed: {e}")
     
-    async def generate_quantum_integers(self, count: int, bit_size: int = 64, use_real_quantum: bool = False) -> List[int]:
-        """Generate quantum random integers from quantum bits"""
-        total_bits_needed = count * bit_size
-        quantum_bits = await self.generate_quantum_random_bits(total_bits_needed, use_real_quantum)
+    async def bias_check(self, num_bits: int = 65536, legacy_bits: int = 2048) -> Dict:
+        """Compare the batched sampler against the single-shot path
+        
+        Runs a deterministic probe circuit (X on qubit 0 only) through both bit
+        extraction paths to confirm qubit 0 comes out first, then compares
+        per-qubit ones frequencies of the two samplers.
+        """
+        num_qubits = min(self.num_qubits, self.backend_qubit_limit(self.simulator))
+        
+        # Bit order probe: only qubit 0 is flipped, so bit 0 must be the only 1
+        probe = QuantumCircuit(num_qubits, num_qubits)
+        probe.x(0)
+        probe.measure(range(num_qubits), range(num_qubits))
+        probe_result = self.simulator.run(transpile(probe, self.simulator), shots=1, memory=True).result()
+        batched_probe = self.memory_to_bits(probe_result.get_memory(), num_qubits).tolist()
+        legacy_probe = [int(b) for b in list(probe_result.get_counts().keys())[0][::-1]]
+        expected_probe = [1] + [0] * (num_qubits - 1)
+        
+        batched = np.array(await self.generate_quantum_random_bits(num_bits, use_pool=False), dtype=np.uint8)
+        legacy = np.array(await self.generate_quantum_random_bits(legacy_bits, batched=False), dtype=np.uint8)
+        
+        def per_qubit_ones(bits: np.ndarray, width: int):
+            shots = bits[:len(bits) // width * width].reshape(-1, width)
+            return shots.sum(axis=0), shots.shape[0]
+        
+        def summarize(bits: np.ndarray, ones: np.ndarray, shots: int) -> Dict:
+            z = (ones - shots / 2) / np.sqrt(shots / 4)
+            return {
+                "bits": int(bits.size),
+                "num_qubits": len(ones),
+                "ones_fraction": float(bits.mean()),
+                "per_qubit_ones_fraction": (ones / shots).tolist(),
+                "per_qubit_p": (stats.norm.sf(np.abs(z)) * 2).tolist(),
+            }
+        
+        batched_ones, batched_shots = per_qubit_ones(batched, num_qubits)
+        legacy_ones, legacy_shots = per_qubit_ones(legacy, 8)
+        
+        # Chi-square homogeneity of each qubit shared by both paths
+        homogeneity_p = []
+        for q in range(min(num_qubits, 8)):
+            table = [
+                [batched_ones[q], batched_shots - batched_ones[q]],
+                [legacy_ones[q], legacy_shots - legacy_ones[q]],
+            ]
+            homogeneity_p.append(float(stats.chi2_contingency(table)[1]))
+        
+        critical_p = 0.01
+        return {
+            "bit_order_ok": batched_probe == expected_probe and legacy_probe == expected_probe,
+            "batched": summarize(batched, batched_ones, batched_shots),
+            "legacy": summarize(legacy, legacy_ones, legacy_shots),
+            "per_qubit_homogeneity_p": homogeneity_p,
+            "distributions_match": all(p > critical_p for p in homogeneity_p),
+        }
+    
+    async def generate_quantum_integers(
+        self,
+        count: int,
+        bit_size: int = 64,
+        use_real_quantum: bool = False,
+        bit_order: str = "little",
+    ) -> np.ndarray:
+        """Generate quantum random integers from quantum bits
         
-        integers = []
-        for i in range(count):
-            bit_chunk = quantum_bits[i * bit_size:(i + 1) * bit_size]
-            # Convert binary bits to integer
-            integer_value = sum(bit * (2 ** idx) for idx, bit in enumerate(bit_chunk))
-            integers.append(integer_value)
+        Each integer takes ``bit_size`` (8, 16, 32 or 64) consecutive bits; with
+        the default ``bit_order="little"`` the first bit sampled is worth 2**0.
+        See ``bit_engine.pack_integers``.
+        """
+        quantum_bits = await self.generate_quantum_random_bits(count * bit_size, use_real_quantum, as_array=True)
+        return pack_integers(quantum_bits, bit_size, bit_order)
+    
+    async def iter_quantum_integers(
+        self,
+        count: int,
+        use_real_quantum: bool = False,
+        chunk_size: int = 8192,
+        bit_size: int = 64,
+        bit_order: str = "little",
+    ):
+        """Yield ``count`` quantum integers as arrays of up to ``chunk_size``
         
-        return integers
+        Only one chunk is held at a time, so callers can stream arbitrarily
+        many values in constant memory.
+        """
+        remaining = count
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            yield await self.generate_quantum_integers(n, bit_size, use_real_quantum, bit_order)
+            remaining -= n
 
 class StatisticalAnalyzer:
     """Perform statistical analysis on random number sequences"""
     
     @staticmethod
-    def frequency_test(sequence: List[int]) -> float:
-        """NIST Frequency (Monobit) Test"""
-        n = len(sequence)
+    def frequency_p_value(ones: int, n: int) -> float:
+        """Monobit p-value from the count of ones among ``n`` bits"""
         if n == 0:
             return 0.0
         
-        # Convert to binary string
-        binary_str = ''.join([format(num, '064b') for num in sequence])
-        
-        # Count ones and zeros
-        ones = binary_str.count('1')
-        zeros = len(binary_str) - ones
+        zeros = n - ones
         
         # Calculate test statistic
-        s_obs = abs(ones - zeros) / np.sqrt(len(binary_str))
+        s_obs = abs(ones - zeros) / np.sqrt(n)
         
         # Calculate p-value
         p_value = stats.norm.sf(s_obs) * 2  # Two-tailed test
@@ -183,29 +535,17 @@ class StatisticalAnalyzer:
         return p_value
     
     @staticmethod
-    def runs_test(sequence: List[int]) -> float:
-        """NIST Runs Test"""
-        # Convert to binary string
-        binary_str = ''.join([format(num, '064b') for num in sequence])
-        n = len(binary_str)
-        
+    def runs_p_value(ones: int, runs: int, n: int) -> float:
+        """Runs p-value from the counts of ones and runs among ``n`` bits"""
         if n == 0:
             return 0.0
         
-        # Count ones
-        ones = binary_str.count('1')
         pi = ones / n
         
         # Pre-test: frequency must be approximately 0.5
         if abs(pi - 0.5) >= 2 / np.sqrt(n):
             return 0.0
         
-        # Count runs
-        runs = 1
-        for i in range(1, n):
-            if binary_str[i] != binary_str[i-1]:
-                runs += 1
-        
         # Calculate test statistic
         expected_runs = 2 * n * pi * (1 - pi) + 1
         variance = 2 * n * pi * (1 - pi) * (2 * n * pi * (1 - pi) - 1)
@@ -219,65 +559,84 @@ class StatisticalAnalyzer:
         return p_value
     
     @staticmethod
-    def uniformity_test(sequence: List[int]) -> float:
+    def uniformity_p_value(observed: np.ndarray) -> float:
+        """Chi-square p-value for binned counts against a flat distribution"""
+        num_bins = len(observed)
+        expected = [observed.sum() / num_bins] * num_bins
+        chi_stat, p_value = stats.chisquare(observed, expected)
+        return p_value
+    
+    @staticmethod
+    def frequency_test(sequence: Union[List[int], BitSequence]) -> float:
+        """NIST Frequency (Monobit) Test"""
+        bits = BitSequence.coerce(sequence)
+        return StatisticalAnalyzer.frequency_p_value(bits.ones, len(bits))
+    
+    @staticmethod
+    def runs_test(sequence: Union[List[int], BitSequence]) -> float:
+        """NIST Runs Test"""
+        bits = BitSequence.coerce(sequence)
+        if len(bits) == 0:
+            return 0.0
+        return StatisticalAnalyzer.runs_p_value(bits.ones, bits.runs(), len(bits))
+    
+    @staticmethod
+    def uniformity_test(sequence: Union[List[int], np.ndarray]) -> float:
         """Chi-square uniformity test"""
         if len(sequence) < 10:
             return 0.0
         
         # Normalize to [0, 1) range
-        max_val = max(sequence)
+        values = np.asarray(sequence)
+        max_val = values.max()
         if max_val == 0:
             return 0.0
         
-        normalized = [x / (max_val + 1) for x in sequence]
+        normalized = values / (float(max_val) + 1)
         
         # Create bins for chi-square test
         num_bins = min(10, len(sequence) // 5)
         observed, _ = np.histogram(normalized, bins=num_bins, range=(0, 1))
-        expected = [len(sequence) / num_bins] * num_bins
         
-        # Chi-square test
-        chi_stat, p_value = stats.chisquare(observed, expected)
-        
-        return p_value
+        return StatisticalAnalyzer.uniformity_p_value(observed)
     
     @staticmethod
-    def kolmogorov_smirnov_test(sequence1: List[int], sequence2: List[int]) -> float:
+    def kolmogorov_smirnov_test(
+        sequence1: Union[List[int], np.ndarray],
+        sequence2: Union[List[int], np.ndarray],
+    ) -> float:
         """Two-sample Kolmogorov-Smirnov test"""
         if len(sequence1) == 0 or len(sequence2) == 0:
             return 0.0
         
         # Normalize sequences
-        max1, max2 = max(sequence1), max(sequence2)
+        values1, values2 = np.asarray(sequence1), np.asarray(sequence2)
+        max1, max2 = values1.max(), values2.max()
         if max1 == 0 or max2 == 0:
             return 0.0
         
-        norm1 = [x / max1 for x in sequence1]
-        norm2 = [x / max2 for x in sequence2]
+        norm1 = values1 / float(max1)
+        norm2 = values2 / float(max2)
         
         # Perform KS test
         statistic, p_value = stats.ks_2samp(norm1, norm2)
         
-        return p_value
+        return float(p_value)
     
     @staticmethod
-    def analyze_sequence(sequence: List[int], name: str = "Unknown") -> Dict:
-        """Comprehensive statistical analysis of a random sequence"""
-        if not sequence:
-            return {"error": "Empty sequence"}
-        
-        analyzer = StatisticalAnalyzer()
-        
+    def summarize(name, count, min_value, max_value, mean, std, frequency_p, runs_p, uniformity_p) -> Dict:
+        """Assemble the analysis result dict and pass/fail verdicts"""
         results = {
             "name": name,
-            "count": len(sequence),
-            "min": min(sequence),
-            "max": max(sequence),
-            "mean": np.mean(sequence),
-            "std": np.std(sequence),
-            "frequency_test_p": analyzer.frequency_test(sequence),
-            "runs_test_p": analyzer.runs_test(sequence),
-            "uniformity_test_p": analyzer.uniformity_test(sequence),
+            "count": count,
+            "min": int(min_value),
+            "max": int(max_value),
+            "mean": float(mean),
+            "std": float(std),
+            # Plain floats so job results stay JSON serialisable
+            "frequency_test_p": float(frequency_p),
+            "runs_test_p": float(runs_p),
+            "uniformity_test_p": float(uniformity_p),
         }
         
         # Determine if sequence passes randomness tests (p > 0.01)
@@ -292,16 +651,396 @@ class StatisticalAnalyzer:
         ])
         
         return results
+    
+    @staticmethod
+    def add_analysis_tasks(graph: TaskGraph, prefix: str, source: str, name: str, full_battery: bool = False) -> str:
+        """Add the stages of ``analyze_sequence`` to a task graph
+        
+        ``source`` names the task producing the sequence as a list. Each test
+        becomes its own stage so independent tests run concurrently. Returns
+        the name of the task producing the final result dict.
+        """
+        analyzer = StatisticalAnalyzer
+        graph.add(f"{prefix}_bits", BitSequence.from_numbers, [source])
+        graph.add(f"{prefix}_moments", lambda seq: (np.min(seq), np.max(seq), np.mean(seq), np.std(seq)), [source])
+        graph.add(f"{prefix}_frequency", analyzer.frequency_test, [f"{prefix}_bits"])
+        graph.add(f"{prefix}_runs", analyzer.runs_test, [f"{prefix}_bits"])
+        graph.add(f"{prefix}_uniformity", analyzer.uniformity_test, [source])
+        stages = [source, f"{prefix}_moments", f"{prefix}_frequency", f"{prefix}_runs", f"{prefix}_uniformity"]
+        if full_battery:
+            graph.add(f"{prefix}_battery", run_battery, [f"{prefix}_bits"])
+            stages.append(f"{prefix}_battery")
+        
+        def combine(sequence, moments, frequency_p, runs_p, uniformity_p, battery=None):
+            if len(sequence) == 0:
+                return {"error": "Empty sequence"}
+            results = analyzer.summarize(name, len(sequence), *moments, frequency_p, runs_p, uniformity_p)
+            if battery is not None:
+                results["nist_battery"] = battery
+            return results
+        
+        graph.add(f"{prefix}_stats", combine, stages)
+        return f"{prefix}_stats"
+    
+    @staticmethod
+    def analyze_sequence(sequence: Union[List[int], np.ndarray], name: str = "Unknown", full_battery: bool = False) -> Dict:
+        """Comprehensive statistical analysis of a random sequence"""
+        if len(sequence) == 0:
+            return {"error": "Empty sequence"}
+        
+        analyzer = StatisticalAnalyzer()
+        # Serialise to bits once and share across the bit-level tests
+        bits = BitSequence.from_numbers(sequence)
+        
+        results = StatisticalAnalyzer.summarize(
+            name=name,
+            count=len(sequence),
+            min_value=np.min(sequence),
+            max_value=np.max(sequence),
+            mean=np.mean(sequence),
+            std=np.std(sequence),
+            frequency_p=analyzer.frequency_test(bits),
+            runs_p=analyzer.runs_test(bits),
+            uniformity_p=analyzer.uniformity_test(sequence),
+        )
+        
+        if full_battery:
+            results["nist_battery"] = run_battery(bits)
+        
+        return results
+
+class IncrementalAnalyzer:
+    """Streaming counterpart of ``StatisticalAnalyzer.analyze_sequence``
+    
+    Chunks are fed through ``update`` and folded into O(1) running state:
+    ones and run counts (carrying the last bit across chunk boundaries),
+    Welford/Chan mean and variance, min/max, and a fixed-size histogram.
+    ``finalize`` may be called at any point for rolling results and returns
+    the same dict as ``analyze_sequence``.
+    
+    Frequency, runs, min, max, mean and std match the in-memory analysis. The
+    uniformity bins depend on the final maximum, so values are kept in a
+    2**16-bin histogram whose bin width doubles as the maximum grows; bins are
+    exact while values stay below 2**16 and otherwise each uniformity bin edge
+    is resolved to within one histogram bin.
+    """
+    
+    HISTOGRAM_BITS = 16
+    
+    def __init__(self, name: str = "Unknown"):
+        self.name = name
+        self.count = 0
+        self.min_value = None
+        self.max_value = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.n_bits = 0
+        self.ones = 0
+        self.runs = 0
+        self.last_bit = None
+        self.histogram_shift = 0
+        self.histogram = np.zeros(1 << self.HISTOGRAM_BITS, dtype=np.int64)
+    
+    def update(self, chunk) -> "IncrementalAnalyzer":
+        """Fold a chunk of unsigned 64-bit values into the running state"""
+        if isinstance(chunk, np.ndarray):
+            values = chunk.astype(np.uint64, copy=False)
+        else:
+            values = np.fromiter(chunk, dtype=np.uint64, count=len(chunk))
+        if values.size == 0:
+            return self
+        
+        # Bit-level counts, joining the run that spans the chunk boundary
+        bits = BitSequence.from_numbers(values)
+        self.ones += bits.ones
+        self.runs += bits.runs()
+        if self.last_bit is not None and bits.bits[0] == self.last_bit:
+            self.runs -= 1
+        self.last_bit = bits.bits[-1]
+        self.n_bits += len(bits)
+        
+        # Chan et al. parallel update of mean and sum of squared deviations
+        chunk_n = values.size
+        floats = values.astype(np.float64)
+        chunk_mean = float(floats.mean())
+        chunk_m2 = float(np.sum((floats - chunk_mean) ** 2))
+        total = self.count + chunk_n
+        delta = chunk_mean - self.mean
+        self.mean += delta * chunk_n / total
+        self.m2 += chunk_m2 + delta * delta * self.count * chunk_n / total
+        self.count = total
+        
+        chunk_min, chunk_max = int(values.min()), int(values.max())
+        self.min_value = chunk_min if self.min_value is None else min(self.min_value, chunk_min)
+        self.max_value = chunk_max if self.max_value is None else max(self.max_value, chunk_max)
+        
+        # Widen histogram bins until the new maximum fits, then count the chunk
+        shift = max(0, self.max_value.bit_length() - self.HISTOGRAM_BITS)
+        if shift > self.histogram_shift:
+            fold = 1 << min(shift - self.histogram_shift, self.HISTOGRAM_BITS)
+            folded = self.histogram.reshape(-1, fold).sum(axis=1)
+            self.histogram = np.zeros_like(self.histogram)
+            self.histogram[:folded.size] = folded
+            self.histogram_shift = shift
+        self.histogram += np.bincount(
+            (values >> np.uint64(self.histogram_shift)).astype(np.int64),
+            minlength=self.histogram.size,
+        )
+        return self
+    
+    def _uniformity_p(self) -> float:
+        if self.count < 10 or self.max_value == 0:
+            return 0.0
+        
+        num_bins = min(10, self.count // 5)
+        # Bin each histogram bin by its lower edge, the same way x / (max + 1) is binned
+        lower_edges = np.arange(self.histogram.size, dtype=np.float64) * float(1 << self.histogram_shift)
+        observed, _ = np.histogram(lower_edges / (self.max_value + 1), bins=num_bins,
+                                   range=(0, 1), weights=self.histogram)
+        return StatisticalAnalyzer.uniformity_p_value(observed)
+    
+    def finalize(self) -> Dict:
+        """Result dict for everything seen so far"""
+        if self.count == 0:
+            return {"error": "Empty sequence"}
+        
+        return StatisticalAnalyzer.summarize(
+            name=self.name,
+            count=self.count,
+            min_value=self.min_value,
+            max_value=self.max_value,
+            mean=self.mean,
+            std=np.sqrt(self.m2 / self.count),
+            frequency_p=StatisticalAnalyzer.frequency_p_value(self.ones, self.n_bits),
+            runs_p=StatisticalAnalyzer.runs_p_value(self.ones, self.runs, self.n_bits),
+            uniformity_p=self._uniformity_p(),
+        )
+
+# Set in each validation worker: queue for stage events back to the API process
+_stage_events = None
+
+def _init_validation_worker(nice: int, stage_events=None):
+    """Process initializer for validation workers"""
+    global _stage_events
+    _stage_events = stage_events
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+class JobEventBroker:
+    """Fans job events out to server-sent event subscribers
+    
+    Each subscriber owns a bounded asyncio queue for one job, or for the
+    status events of every job (``job_id=None``). ``publish`` may
+    be called from any thread; a subscriber that falls behind loses events
+    rather than growing without bound.
+    """
+    
+    def __init__(self, max_pending: int = 256):
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._subscribers: Dict[Optional[str], set] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def subscribe(self, job_id: Optional[str]) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.max_pending)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, job_id: Optional[str], queue: asyncio.Queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+    
+    def has_subscribers(self, job_id: str) -> bool:
+        """Whether anyone listens to ``job_id`` or to every job"""
+        return job_id in self._subscribers or None in self._subscribers
+    
+    def publish(self, job_id: str, event: str, data: Dict):
+        if self._loop is None or not self.has_subscribers(job_id):
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(job_id, event, data)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, job_id, event, data)
+    
+    def _deliver(self, job_id: str, event: str, data: Dict):
+        queues = list(self._subscribers.get(job_id, ()))
+        if event == "status":
+            queues += self._subscribers.get(None, ())
+        for queue in queues:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                self.dropped += 1
+    
+    def stats(self) -> Dict:
+        return {
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "dropped_events": self.dropped,
+        }
+
+class ValidationWorkerPool:
+    """Process pool for validation jobs with a bounded FIFO wait queue
+    
+    At most ``max_workers`` jobs run at once, each in its own worker process,
+    so CPU-bound analysis never blocks the event loop. Up to ``max_queue``
+    further jobs wait in submission order; beyond that, submissions are
+    rejected.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = None,
+        max_queue: int = 16,
+        worker_nice: int = 10,
+        stage_threads: int = 4,
+        on_stage=None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        # Threads each job uses to run its independent stages concurrently
+        self.stage_threads = stage_threads
+        # Called as on_stage(job_id, event) for every stage a worker finishes
+        self.on_stage = on_stage
+        self._stage_events = None
+        # Workers run at lower priority so the API process wins CPU contention
+        self.worker_nice = worker_nice
+        self.completed = 0
+        self.failed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._waiting: deque = deque()
+        self._running = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+    
+    def _ensure_started(self):
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and Aer threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            # Queues can only reach workers through the initializer
+            self._stage_events = context.Queue()
+            threading.Thread(target=self._drain_stage_events, args=(self._stage_events,), daemon=True).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_validation_worker,
+                initargs=(self.worker_nice, self._stage_events),
+            )
+            self._slots = asyncio.Semaphore(self.max_workers)
+    
+    def is_full(self) -> bool:
+        return len(self._waiting) >= self.max_queue
+    
+    def enqueue(self, job_id: str):
+        self._waiting.append(job_id)
+    
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position among waiting jobs, or None once a job has started"""
+        try:
+            return self._waiting.index(job_id) + 1
+        except ValueError:
+            return None
+    
+    @asynccontextmanager
+    async def slot(self, job_id: str):
+        """Hold a worker slot for one job, waiting in FIFO order for it"""
+        self._ensure_started()
+        if job_id not in self._waiting:
+            self._waiting.append(job_id)
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting.remove(job_id)
+        
+        self._running.add(job_id)
+        try:
+            yield
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+        finally:
+            self._running.discard(job_id)
+            self._slots.release()
+    
+    async def run(self, func, *args):
+        """Run ``func(*args)`` in a worker process without blocking the loop"""
+        self._ensure_started()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def _drain_stage_events(self, events):
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            if self.on_stage is not None:
+                self.on_stage(*item)
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._stage_events.put(None)
+    
+    def stats(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": len(self._running),
+            "queued": len(self._waiting),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
 
 # Initialize quantum generator
-quantum_gen = QuantumRandomGenerator()
+quantum_gen = QuantumRandomGenerator(
+    entropy_pool=EntropyPool(
+        capacity_bytes=int(os.environ.get("ENTROPY_POOL_BYTES", 1 << 20)),
+        low_water_bytes=int(os.environ.get("ENTROPY_POOL_LOW_WATER_BYTES", 256 << 10)),
+        refill_chunk_bytes=int(os.environ.get("ENTROPY_POOL_REFILL_CHUNK_BYTES", 64 << 10)),
+        refill_interval=float(os.environ.get("ENTROPY_POOL_REFILL_INTERVAL", 0.1)),
+    )
+)
 analyzer = StatisticalAnalyzer()
+job_events = JobEventBroker()
+validation_pool = ValidationWorkerPool(
+    max_workers=int(os.environ.get("VALIDATION_WORKERS", 0)) or None,
+    max_queue=int(os.environ.get("VALIDATION_QUEUE_DEPTH", 16)),
+    worker_nice=int(os.environ.get("VALIDATION_WORKER_NICE", 10)),
+    stage_threads=int(os.environ.get("VALIDATION_STAGE_THREADS", 4)),
+    on_stage=lambda job_id, event: job_events.publish(job_id, "stage", event),
+)
+
+def publish_job_update(job_id: str, job: ValidationResult, summary: Dict):
+    """Job store listener: push state transitions and final results"""
+    if not job_events.has_subscribers(job_id):
+        return
+    job_events.publish(job_id, "status", summary)
+    if summary["status"] not in ACTIVE_STATUSES:
+        job_events.publish(job_id, "result", job.model_dump())
+
+if validation_jobs is not None:
+    validation_jobs.add_listener(publish_job_update)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize quantum service on startup"""
     # Try to initialize IBM Quantum (will fail gracefully if no token)
     await quantum_gen.initialize_ibm_quantum()
+    quantum_gen.start_entropy_pool()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background entropy prefetching and validation workers"""
+    await quantum_gen.entropy_pool.stop()
+    validation_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -310,77 +1049,247 @@ async def root():
         "service": "ICP Quantum Randomness Validator",
         "status": "running",
         "quantum_available": quantum_gen.service is not None,
+        "circuit_cache": quantum_gen.circuit_cache.stats(),
+        "entropy_pool": quantum_gen.entropy_pool.stats(),
+        "validation_pool": validation_pool.stats(),
+        "job_store": validation_jobs.stats(),
+        "result_cache": result_cache.stats(),
+        "job_events": job_events.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/generate-quantum-random")
-async def generate_quantum_random(count: int = 100, use_real_quantum: bool = False):
-    """Generate quantum random numbers"""
+async def generate_quantum_random(
+    count: int = 100,
+    use_real_quantum: bool = False,
+    format: str = "json",
+    bit_size: int = 64,
+    bit_order: str = "little",
+):
+    """Generate quantum random numbers
+    
+    Each number packs ``bit_size`` (8, 16, 32 or 64) sampled bits, the first
+    one least significant unless ``bit_order=big``. ``format=binary`` streams
+    the raw values as little-endian unsigned integers of that width and
+    ``format=ndjson`` streams one ``{"numbers": [...]}`` line per chunk followed
+    by a summary line; both are produced incrementally and have no count cap.
+    """
+    if bit_size not in (8, 16, 32, 64) or bit_order not in ("little", "big"):
+        raise HTTPException(status_code=400, detail="bit_size must be 8, 16, 32 or 64 and bit_order little or big")
+    
+    source = "quantum_real" if use_real_quantum else "quantum_simulator"
+    if format in ("binary", "ndjson"):
+        if count <= 0:
+            raise HTTPException(status_code=400, detail="Count must be positive")
+        chunks = quantum_gen.iter_quantum_integers(
+            count, use_real_quantum=use_real_quantum, bit_size=bit_size, bit_order=bit_order
+        )
+        headers = {"X-Count": str(count), "X-Source": source}
+        
+        if format == "binary":
+            async def body():
+                async for values in chunks:
+                    yield values.astype(f"<u{bit_size // 8}").tobytes()
+            
+            headers["Content-Length"] = str(count * bit_size // 8)
+            return StreamingResponse(body(), media_type="application/octet-stream", headers=headers)
+        
+        async def lines():
+            async for values in chunks:
+                yield '{"numbers": ' + json.dumps(values.tolist()) + '}\n'
+            yield json.dumps({"count": count, "source": source, "timestamp": datetime.now().isoformat()}) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+    
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be json, binary or ndjson")
+    
     try:
         if count > 10000:
-            raise HTTPException(status_code=400, detail="Count too large (max 10000)")
+            raise HTTPException(status_code=400, detail="Count too large (max 10000); use format=binary or ndjson")
         
-        numbers = await quantum_gen.generate_quantum_integers(count, use_real_quantum=use_real_quantum)
+        numbers = await quantum_gen.generate_quantum_integers(
+            count, bit_size, use_real_quantum=use_real_quantum, bit_order=bit_order
+        )
         
         return {
-            "numbers": numbers,
+            "numbers": numbers.tolist(),
             "count": len(numbers),
-            "source": "quantum_real" if use_real_quantum else "quantum_simulator",
+            "source": source,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/nist-tests")
+async def list_nist_tests():
+    """List the registered NIST SP 800-22 tests and their input requirements"""
+    return [
+        {"name": test.name, "description": test.description, "min_bits": test.min_bits}
+        for test in TEST_REGISTRY.values()
+    ]
+
+@app.get("/bias-check")
+async def bias_check(num_bits: int = 65536):
+    """Check that batched sampling matches the single-shot path"""
+    return await quantum_gen.bias_check(num_bits=num_bits)
+
 @app.post("/validate-randomness")
 async def validate_randomness(request: ValidationRequest, background_tasks: BackgroundTasks):
     """Start randomness validation job"""
+    try:
+        icp_array = np.fromiter(request.icp_numbers, dtype=np.uint64, count=len(request.icp_numbers))
+    except (OverflowError, ValueError):
+        raise HTTPException(status_code=400, detail="icp_numbers must be unsigned 64-bit integers")
+    
+    return submit_validation(icp_array, request, background_tasks)
+
+@app.post("/validate-randomness/binary")
+async def validate_randomness_binary(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    options: ValidationOptions = Depends(),
+):
+    """Start a validation job from packed little-endian uint64 ICP values
+    
+    The body is either the raw values (``application/octet-stream``) or a
+    multipart upload with a ``file`` field. It is wrapped with ``np.frombuffer``
+    without copying and never turned into Python ints; options are query
+    parameters.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart upload needs a 'file' field")
+        data = await upload.read()
+    else:
+        data = await request.body()
+    
+    if not data or len(data) % 8:
+        raise HTTPException(status_code=400, detail="Body must be a non-empty multiple of 8 bytes")
+    
+    return submit_validation(np.frombuffer(data, dtype="<u8"), options, background_tasks)
+
+def submit_validation(icp_array: np.ndarray, request: ValidationOptions, background_tasks: BackgroundTasks) -> Dict:
+    """Create a job for ``icp_array``, answering from the result cache if possible"""
     job_id = str(uuid.uuid4())
+    created_at = datetime.now().isoformat()
+    
+    # Identical input and configuration: answer straight from the cache
+    cache_key = result_key(icp_array, full_battery=request.full_battery)
+    cached = result_cache.get(cache_key)
+    quantum_config = {"quantum_sample_size": request.quantum_sample_size, "use_real_quantum": request.use_real_quantum}
+    if cached is not None and not request.refresh_quantum and cached["quantum_config"] == quantum_config:
+        validation_jobs.put(job_id, ValidationResult(
+            job_id=job_id,
+            status="completed",
+            created_at=created_at,
+            completed_at=created_at,
+            cache="hit",
+            **cached["results"]
+        ))
+        return {"job_id": job_id, "status": "completed", "queue_position": None}
+    
+    if validation_pool.is_full():
+        raise HTTPException(status_code=429, detail="Validation queue is full, retry later")
     
-    # Create validation job
+    # Create validation job; a cached ICP side is visible before the quantum side runs
+    icp_stats = cached["results"]["icp_stats"] if cached is not None else None
     validation_job = ValidationResult(
         job_id=job_id,
         status="pending",
-        created_at=datetime.now().isoformat()
+        created_at=created_at,
+        icp_stats=icp_stats,
+        cache="partial" if cached is not None else "miss"
     )
-    validation_jobs[job_id] = validation_job
+    validation_jobs.put(job_id, validation_job)
+    
+    # Reserve a queue slot now so concurrent submissions see it
+    validation_pool.enqueue(job_id)
     
     # Start background validation
-    background_tasks.add_task(run_validation, job_id, request)
+    background_tasks.add_task(run_validation, job_id, request, icp_array, cache_key, icp_stats)
     
-    return {"job_id": job_id, "status": "started"}
+    return {"job_id": job_id, "status": "started", "queue_position": validation_pool.position(job_id)}
 
-async def run_validation(job_id: str, request: ValidationRequest):
-    """Run the actual validation in background"""
-    try:
-        job = validation_jobs[job_id]
-        job.status = "running"
-        
-        # Analyze ICP numbers
-        icp_stats = analyzer.analyze_sequence(request.icp_numbers, "ICP raw_rand")
-        job.icp_stats = icp_stats
-        
-        # Generate quantum random numbers
-        quantum_numbers = await quantum_gen.generate_quantum_integers(
-            request.quantum_sample_size, 
-            use_real_quantum=request.use_real_quantum
-        )
-        
-        # Analyze quantum numbers  
-        quantum_stats = analyzer.analyze_sequence(quantum_numbers, "Quantum")
-        job.quantum_stats = quantum_stats
-        
-        # Compare the two sequences
-        ks_p_value = analyzer.kolmogorov_smirnov_test(request.icp_numbers, quantum_numbers)
-        
-        comparison_results = {
-            "ks_test_p_value": ks_p_value,
-            "sequences_similar": ks_p_value > 0.05,  # Not significantly different
-            "icp_passes_all_tests": icp_stats.get("overall_random", False),
-            "quantum_passes_all_tests": quantum_stats.get("overall_random", False),
+def compute_validation(
+    icp_numbers: np.ndarray,
+    quantum_sample_size: int,
+    use_real_quantum: bool,
+    full_battery: bool,
+    prefetched_entropy: bytes = b"",
+    stage_threads: int = 4,
+    icp_stats: Optional[Dict] = None,
+    job_id: Optional[str] = None,
+) -> Dict:
+    """CPU-bound body of a validation job; runs inside a worker process
+    
+    ``prefetched_entropy`` carries packed bits drawn from the parent's entropy
+    pool so the worker only samples the shortfall itself. Stages run on
+    ``stage_threads`` threads and their timings are returned with the result.
+    A cached ``icp_stats`` skips the ICP analysis stages. Given a ``job_id``,
+    every finished stage is reported back to the API process as it completes,
+    with the result of each test.
+    """
+    if use_real_quantum and quantum_gen.service is None:
+        asyncio.run(quantum_gen.initialize_ibm_quantum())
+    quantum_gen.entropy_pool.put(prefetched_entropy)
+    
+    # ICP analysis, quantum sampling and the per-test stages only depend on
+    # their own inputs, so the graph runs them side by side
+    graph = TaskGraph()
+    # The ICP input stays a uint64 array end to end; no Python ints are built
+    graph.add("icp_numbers", lambda: icp_numbers)
+    graph.add("quantum_generation", lambda: asyncio.run(quantum_gen.generate_quantum_integers(
+        quantum_sample_size, 
+        use_real_quantum=use_real_quantum
+    )))
+    icp_task = None
+    if icp_stats is None:
+        icp_task = analyzer.add_analysis_tasks(graph, "icp", "icp_numbers", "ICP raw_rand", full_battery)
+    quantum_task = analyzer.add_analysis_tasks(graph, "quantum", "quantum_generation", "Quantum", full_battery)
+    graph.add("comparison", analyzer.kolmogorov_smirnov_test, ["icp_numbers", "quantum_generation"])
+    
+    on_complete = None
+    if job_id is not None and _stage_events is not None:
+        reported = {"comparison"} | {
+            f"{prefix}_{test}"
+            for prefix in ("icp", "quantum")
+            for test in ("frequency", "runs", "uniformity", "battery", "stats")
         }
         
-        job.comparison_results = comparison_results
-        job.p_values = {
+        def on_complete(name, value, timing):
+            event = {"job_id": job_id, "stage": name, "duration": timing["duration"]}
+            if name in reported:
+                event["result"] = value if isinstance(value, dict) else float(value)
+            _stage_events.put((job_id, event))
+    
+    try:
+        stage_results, stage_timings = graph.run(max_workers=stage_threads, on_complete=on_complete)
+    except Exception as e:
+        # HTTPException and friends do not always survive pickling back to the parent
+        raise RuntimeError(getattr(e, "detail", None) or str(e)) from None
+    
+    if icp_task is not None:
+        icp_stats = stage_results[icp_task]
+    quantum_stats = stage_results[quantum_task]
+    ks_p_value = stage_results["comparison"]
+    
+    comparison_results = {
+        "ks_test_p_value": ks_p_value,
+        "sequences_similar": ks_p_value > 0.05,  # Not significantly different
+        "icp_passes_all_tests": icp_stats.get("overall_random", False),
+        "quantum_passes_all_tests": quantum_stats.get("overall_random", False),
+    }
+    
+    return {
+        "icp_stats": icp_stats,
+        "quantum_stats": quantum_stats,
+        "comparison_results": comparison_results,
+        "p_values": {
             "icp_frequency": icp_stats.get("frequency_test_p", 0),
             "icp_runs": icp_stats.get("runs_test_p", 0),
             "icp_uniformity": icp_stats.get("uniformity_test_p", 0),
@@ -388,34 +1297,177 @@ async def run_validation(job_id: str, request: ValidationRequest):
             "quantum_runs": quantum_stats.get("runs_test_p", 0),
             "quantum_uniformity": quantum_stats.get("uniformity_test_p", 0),
             "comparison_ks": ks_p_value
-        }
-        
+        },
         # Final determination
-        job.is_random = (
+        "is_random": (
             comparison_results["icp_passes_all_tests"] and 
             comparison_results["sequences_similar"]
-        )
+        ),
+        "stage_timings": stage_timings,
+    }
+
+async def run_validation(
+    job_id: str,
+    request: ValidationOptions,
+    icp_array: np.ndarray,
+    cache_key: str,
+    icp_stats: Optional[Dict] = None,
+):
+    """Run the actual validation in background"""
+    job = validation_jobs[job_id]
+    try:
+        async with validation_pool.slot(job_id):
+            job.status = "running"
+            validation_jobs.put(job_id, job)
+            
+            # Hand the worker whatever the entropy pool can cover right now
+            prefetched = b""
+            if not request.use_real_quantum:
+                needed = request.quantum_sample_size * 64 // 8
+                prefetched = quantum_gen.entropy_pool.take(min(needed, quantum_gen.entropy_pool.capacity_bytes))
+            
+            results = await validation_pool.run(
+                compute_validation,
+                icp_array,
+                request.quantum_sample_size,
+                request.use_real_quantum,
+                request.full_battery,
+                prefetched,
+                validation_pool.stage_threads,
+                icp_stats,
+                job_id,
+            )
         
+        for field, value in results.items():
+            setattr(job, field, value)
         job.status = "completed"
         job.completed_at = datetime.now().isoformat()
         
+        results.pop("stage_timings")
+        result_cache.put(cache_key, {
+            "quantum_config": {
+                "quantum_sample_size": request.quantum_sample_size,
+                "use_real_quantum": request.use_real_quantum,
+            },
+            "results": results,
+        })
+        
     except Exception as e:
         job.status = "failed"
+        job.error = str(e)
         job.comparison_results = {"error": str(e)}
+    
+    validation_jobs.put(job_id, job)
+
+@app.post("/analyze-stream")
+async def analyze_stream(request: Request, name: str = "Stream"):
+    """Analyze a request body of little-endian uint64 values without buffering it
+    
+    The body is consumed as it arrives and folded into an IncrementalAnalyzer,
+    so arbitrarily large dumps are analyzed in constant memory.
+    """
+    incremental = IncrementalAnalyzer(name)
+    pending = b""
+    async for data in request.stream():
+        pending += data
+        usable = len(pending) - len(pending) % 8
+        if usable:
+            incremental.update(np.frombuffer(pending[:usable], dtype="<u8"))
+            pending = pending[usable:]
+    
+    if pending:
+        raise HTTPException(status_code=400, detail="Body length must be a multiple of 8 bytes")
+    return incremental.finalize()
+
+@app.get("/result-cache")
+async def result_cache_stats():
+    """Hit rate and size of the validation result cache"""
+    return result_cache.stats()
+
+def format_sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_HEARTBEAT_SECONDS = 15
+
+@app.get("/validation-events/{job_id}")
+async def validation_events(job_id: str):
+    """Server-sent events for one job
+    
+    Sends the current ``status``, then a ``stage`` event as each stage finishes
+    (with the test result for test stages), ``status`` on every transition and
+    a final ``result`` with the full job, after which the stream ends.
+    """
+    # Subscribe before reading the job so no transition can slip in between
+    queue = job_events.subscribe(job_id)
+    job = validation_jobs.get(job_id)
+    if job is None:
+        job_events.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def stream():
+        try:
+            yield format_sse("status", {field: getattr(job, field) for field in SUMMARY_FIELDS})
+            finished = job.status not in ACTIVE_STATUSES
+            event, data = "result", job.model_dump()
+            while not finished:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Also recovers a final result lost to a full subscriber queue
+                    current = validation_jobs.get(job_id)
+                    if current is not None and current.status in ACTIVE_STATUSES:
+                        yield ": keep-alive\n\n"
+                        continue
+                    event, data = "result", current.model_dump() if current is not None else {"error": "Job expired"}
+                finished = event == "result"
+                if not finished:
+                    yield format_sse(event, data)
+            yield format_sse(event, data)
+        finally:
+            job_events.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/validation-events")
+async def all_validation_events():
+    """Server-sent ``status`` events (job summaries) for every job, for dashboards"""
+    queue = job_events.subscribe(None)
+    
+    async def stream():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            job_events.unsubscribe(None, queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @app.get("/validation-status/{job_id}")
 async def get_validation_status(job_id: str):
     """Get validation job status and results"""
-    if job_id not in validation_jobs:
+    job = validation_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return validation_jobs[job_id]
+    job.queue_position = validation_pool.position(job_id)
+    return job
 
 @app.get("/validation-jobs")
-async def list_validation_jobs():
-    """List all validation jobs"""
-    return list(validation_jobs.values())
+async def list_validation_jobs(offset: int = 0, limit: int = 50, status: Optional[str] = None):
+    """List validation job summaries, newest first"""
+    if offset < 0 or not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 500")
+    
+    total, jobs = validation_jobs.list(offset, limit, status)
+    return {"total": total, "offset": offset, "limit": limit, "jobs": jobs}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Event streams never end on their own; cap how long shutdown waits for them
+    uvicorn.run(app, host="0.0.0.0", port=8000, timeout_graceful_shutdown=5)
@@ -0,0 +1,495 @@
+"""
+NIST SP 800-22 statistical test battery
+
+Every test takes a shared ``BitSequence`` and returns either one p-value or a
+list of them. Tests are registered with the minimum input length NIST
+recommends, so ``run_battery`` can skip those that do not apply to a short
+sequence. Tests that only find out at runtime that they cannot be evaluated
+(e.g. too few random-walk cycles) raise ``TestNotApplicable``.
+
+All kernels are vectorized with NumPy; the full battery runs on 1 Mbit in a
+couple of seconds on one core.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Union
+import math
+
+import numpy as np
+from scipy import special, stats
+
+from bit_engine import BitSequence
+
+PValues = Union[float, List[float]]
+
+
+class TestNotApplicable(Exception):
+    """Raised when a test cannot be evaluated on the given sequence"""
+
+
+class NistTest:
+    """A registered test together with its input-length requirement"""
+
+    def __init__(self, name: str, func: Callable[[BitSequence], PValues], min_bits: int, description: str):
+        self.name = name
+        self.func = func
+        self.min_bits = min_bits
+        self.description = description
+
+    def applies_to(self, n_bits: int) -> bool:
+        return n_bits >= self.min_bits
+
+
+TEST_REGISTRY: "OrderedDict[str, NistTest]" = OrderedDict()
+
+
+def register_test(name: str, min_bits: int):
+    """Decorator adding a test function to the registry"""
+    def decorator(func):
+        description = (func.__doc__ or name).strip().splitlines()[0]
+        TEST_REGISTRY[name] = NistTest(name, func, min_bits, description)
+        return func
+    return decorator
+
+
+def igamc(a: float, x: float) -> float:
+    """Upper regularized incomplete gamma function, as used throughout SP 800-22"""
+    return float(special.gammaincc(a, x))
+
+
+def sliding_windows(bits: np.ndarray, m: int, cyclic: bool = False) -> np.ndarray:
+    """Integer value of every m-bit window, most-significant bit first"""
+    if cyclic:
+        bits = np.concatenate([bits, bits[:m - 1]])
+    count = bits.size - m + 1
+    windows = np.zeros(count, dtype=np.int64)
+    for j in range(m):
+        windows <<= 1
+        windows |= bits[j:j + count]
+    return windows
+
+
+def proportion_passes(p_values: List[float], alpha: float) -> bool:
+    """SP 800-22 section 4.2.1 proportion check for tests with many p-values"""
+    k = len(p_values)
+    if k == 1:
+        return p_values[0] >= alpha
+    passing = sum(p >= alpha for p in p_values) / k
+    return passing >= (1 - alpha) - 3 * math.sqrt(alpha * (1 - alpha) / k)
+
+
+@register_test("frequency", min_bits=100)
+def frequency(bits: BitSequence) -> float:
+    """Frequency (monobit) test"""
+    n = len(bits)
+    s_obs = abs(bits.ones - bits.zeros) / np.sqrt(n)
+    return float(special.erfc(s_obs / np.sqrt(2)))
+
+
+@register_test("block_frequency", min_bits=100)
+def block_frequency(bits: BitSequence, block_size: Optional[int] = None) -> float:
+    """Frequency test within a block"""
+    n = len(bits)
+    # M >= 20, M > 0.01n and N < 100 (SP 800-22 section 2.2.7)
+    block_size = block_size or max(20, n // 99 + 1)
+    num_blocks = n // block_size
+    blocks = bits.bits[:num_blocks * block_size].reshape(num_blocks, block_size)
+
+    proportions = blocks.sum(axis=1) / block_size
+    chi_squared = 4 * block_size * np.sum((proportions - 0.5) ** 2)
+    return igamc(num_blocks / 2, chi_squared / 2)
+
+
+@register_test("runs", min_bits=100)
+def runs(bits: BitSequence) -> float:
+    """Runs test"""
+    n = len(bits)
+    pi = bits.ones / n
+
+    # Pre-test: frequency must be approximately 0.5
+    if abs(pi - 0.5) >= 2 / np.sqrt(n):
+        return 0.0
+
+    v_obs = bits.runs()
+    return float(special.erfc(abs(v_obs - 2 * n * pi * (1 - pi))
+                              / (2 * np.sqrt(2 * n) * pi * (1 - pi))))
+
+
+# (min n, block size M, class upper bounds, class probabilities) per SP 800-22 section 2.4.4
+_LONGEST_RUN_PARAMS = [
+    (750000, 10000, [10, 11, 12, 13, 14, 15], [0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727]),
+    (6272, 128, [4, 5, 6, 7, 8], [0.1174, 0.2430, 0.2493, 0.1752, 0.1027, 0.1124]),
+    (128, 8, [1, 2, 3], [0.2148, 0.3672, 0.2305, 0.1875]),
+]
+
+
+@register_test("longest_run", min_bits=128)
+def longest_run(bits: BitSequence) -> float:
+    """Test for the longest run of ones in a block"""
+    n = len(bits)
+    _, block_size, bounds, probabilities = next(p for p in _LONGEST_RUN_PARAMS if n >= p[0])
+    num_blocks = n // block_size
+    blocks = bits.bits[:num_blocks * block_size].reshape(num_blocks, block_size)
+
+    # Pad every block with zeros so runs never cross a block boundary
+    padded = np.zeros((num_blocks, block_size + 2), dtype=np.int8)
+    padded[:, 1:-1] = blocks
+    edges = np.diff(padded.ravel())
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    longest = np.zeros(num_blocks, dtype=np.int64)
+    np.maximum.at(longest, starts // (block_size + 2), ends - starts)
+
+    classes = np.searchsorted(bounds, longest, side='left')
+    observed = np.bincount(classes, minlength=len(probabilities))
+    expected = num_blocks * np.asarray(probabilities)
+    chi_squared = np.sum((observed - expected) ** 2 / expected)
+    return igamc((len(probabilities) - 1) / 2, chi_squared / 2)
+
+
+def gf2_rank(rows: np.ndarray, width: int) -> np.ndarray:
+    """Rank over GF(2) of a stack of matrices given as packed integer rows"""
+    rows = rows.copy()
+    num_matrices, num_rows = rows.shape
+    ranks = np.zeros(num_matrices, dtype=np.int64)
+    used = np.zeros(rows.shape, dtype=bool)
+    row_index = np.arange(num_rows)
+    matrix_index = np.arange(num_matrices)
+    one = rows.dtype.type(1)
+
+    for bit in range(width - 1, -1, -1):
+        has_bit = ((rows >> rows.dtype.type(bit)) & one).astype(bool)
+        candidates = has_bit & ~used
+        found = candidates.any(axis=1)
+        pivot = candidates.argmax(axis=1)
+        pivot_rows = np.where(found, rows[matrix_index, pivot], 0).astype(rows.dtype)
+
+        eliminate = has_bit & (row_index[None, :] != pivot[:, None]) & found[:, None]
+        rows ^= np.where(eliminate, pivot_rows[:, None], 0).astype(rows.dtype)
+        used[matrix_index[found], pivot[found]] = True
+        ranks += found
+    return ranks
+
+
+@register_test("binary_matrix_rank", min_bits=38912)
+def binary_matrix_rank(bits: BitSequence) -> float:
+    """Binary matrix rank test on 32x32 matrices"""
+    size = 32
+    num_matrices = len(bits) // (size * size)
+    packed = np.packbits(bits.bits[:num_matrices * size * size])
+    rows = packed.view('>u4').astype(np.uint32).reshape(num_matrices, size)
+
+    ranks = gf2_rank(rows, size)
+    full = np.count_nonzero(ranks == size)
+    one_less = np.count_nonzero(ranks == size - 1)
+    observed = np.array([full, one_less, num_matrices - full - one_less])
+    expected = num_matrices * np.array([0.2888, 0.5776, 0.1336])
+    chi_squared = np.sum((observed - expected) ** 2 / expected)
+    return float(np.exp(-chi_squared / 2))
+
+
+@register_test("dft_spectral", min_bits=1000)
+def dft_spectral(bits: BitSequence) -> float:
+    """Discrete Fourier transform (spectral) test"""
+    n = len(bits)
+    x = 2.0 * bits.bits - 1.0
+    modulus = np.abs(np.fft.rfft(x)[:n // 2])
+
+    threshold = np.sqrt(np.log(1 / 0.05) * n)
+    expected_peaks = 0.95 * n / 2
+    observed_peaks = np.count_nonzero(modulus < threshold)
+    d = (observed_peaks - expected_peaks) / np.sqrt(n * 0.95 * 0.05 / 4)
+    return float(special.erfc(abs(d) / np.sqrt(2)))
+
+
+def aperiodic_templates(m: int) -> np.ndarray:
+    """All m-bit templates that cannot overlap a shifted copy of themselves"""
+    templates = []
+    for value in range(1 << m):
+        pattern = format(value, f'0{m}b')
+        if not any(pattern[:k] == pattern[m - k:] for k in range(1, m)):
+            templates.append(value)
+    return np.array(templates, dtype=np.int64)
+
+
+@register_test("non_overlapping_template", min_bits=32768)
+def non_overlapping_template(bits: BitSequence, m: int = 9, num_blocks: int = 8) -> List[float]:
+    """Non-overlapping template matching test over every aperiodic 9-bit template"""
+    block_size = len(bits) // num_blocks
+    windows = sliding_windows(bits.bits[:num_blocks * block_size], m)
+
+    # Aperiodic templates cannot overlap themselves, so counting every
+    # occurrence that fits inside a block equals the scan-and-skip count
+    per_block = block_size - m + 1
+    starts = np.arange(num_blocks)[:, None] * block_size + np.arange(per_block)[None, :]
+    block_ids = np.repeat(np.arange(num_blocks), per_block)
+    counts = np.bincount(block_ids * (1 << m) + windows[starts.ravel()],
+                         minlength=num_blocks << m).reshape(num_blocks, 1 << m)
+
+    observed = counts[:, aperiodic_templates(m)]
+    mean = (block_size - m + 1) / 2 ** m
+    variance = block_size * (1 / 2 ** m - (2 * m - 1) / 2 ** (2 * m))
+    chi_squared = np.sum((observed - mean) ** 2, axis=0) / variance
+    return special.gammaincc(num_blocks / 2, chi_squared / 2).tolist()
+
+
+@register_test("overlapping_template", min_bits=103200)
+def overlapping_template(bits: BitSequence, m: int = 9) -> float:
+    """Overlapping template matching test for the all-ones 9-bit template"""
+    block_size = 1032
+    num_blocks = len(bits) // block_size
+    blocks = bits.bits[:num_blocks * block_size].reshape(num_blocks, block_size)
+
+    # Window hits of the all-ones template: m consecutive ones inside a block
+    hits = np.ones((num_blocks, block_size - m + 1), dtype=bool)
+    for j in range(m):
+        hits &= blocks[:, j:block_size - m + 1 + j].astype(bool)
+    matches = np.minimum(hits.sum(axis=1), 5)
+
+    # Revised class probabilities for M = 1032, m = 9 (SP 800-22 rev 1a)
+    probabilities = np.array([0.364091, 0.185659, 0.139381, 0.100571, 0.070432, 0.139865])
+    observed = np.bincount(matches, minlength=6)
+    expected = num_blocks * probabilities
+    chi_squared = np.sum((observed - expected) ** 2 / expected)
+    return igamc(5 / 2, chi_squared / 2)
+
+
+# (min n, L) and the expected value / variance of f_n for each L
+_UNIVERSAL_L = [(1059061760, 16), (496435200, 15), (231669760, 14), (107560960, 13),
+                (49643520, 12), (22753280, 11), (10342400, 10), (4654080, 9),
+                (2068480, 8), (904960, 7), (387840, 6)]
+_UNIVERSAL_STATS = {
+    6: (5.2177052, 2.954), 7: (6.1962507, 3.125), 8: (7.1836656, 3.238),
+    9: (8.1764248, 3.311), 10: (9.1723243, 3.356), 11: (10.170032, 3.384),
+    12: (11.168765, 3.401), 13: (12.168070, 3.410), 14: (13.167693, 3.416),
+    15: (14.167488, 3.419), 16: (15.167379, 3.421),
+}
+
+
+@register_test("maurer_universal", min_bits=387840)
+def maurer_universal(bits: BitSequence) -> float:
+    """Maurer's universal statistical test"""
+    n = len(bits)
+    block_len = next(length for min_n, length in _UNIVERSAL_L if n >= min_n)
+    init_blocks = 10 * 2 ** block_len
+    num_blocks = n // block_len
+    test_blocks = num_blocks - init_blocks
+
+    blocks = bits.bits[:num_blocks * block_len].reshape(num_blocks, block_len)
+    values = blocks.astype(np.int64) @ (1 << np.arange(block_len - 1, -1, -1))
+
+    # Distance from each block to the previous block with the same value
+    positions = np.arange(1, num_blocks + 1)
+    order = np.lexsort((positions, values))
+    previous = np.zeros(num_blocks, dtype=np.int64)
+    same = values[order][1:] == values[order][:-1]
+    previous[order[1:][same]] = positions[order[:-1][same]]
+
+    distances = positions[init_blocks:] - previous[init_blocks:]
+    fn = np.sum(np.log2(distances)) / test_blocks
+
+    expected, variance = _UNIVERSAL_STATS[block_len]
+    c = 0.7 - 0.8 / block_len + (4 + 32 / block_len) * test_blocks ** (-3 / block_len) / 15
+    sigma = c * np.sqrt(variance / test_blocks)
+    return float(special.erfc(abs(fn - expected) / (np.sqrt(2) * sigma)))
+
+
+def linear_complexities(blocks: np.ndarray) -> np.ndarray:
+    """Berlekamp-Massey linear complexity of every row, run for all rows at once"""
+    num_blocks, block_size = blocks.shape
+    width = block_size + 1
+    connection = np.zeros((num_blocks, width), dtype=np.uint8)
+    connection[:, 0] = 1
+    complexity = np.zeros(num_blocks, dtype=np.int64)
+
+    # shifted holds B(x) * x^(N - m). Its view slides one column left per
+    # step, which multiplies every row by x without copying.
+    shifted = np.zeros((num_blocks, 2 * width), dtype=np.uint8)
+    shifted[:, width + 1] = 1  # B(x) = 1 and m = -1, so x^1 at N = 0
+
+    for step in range(block_size):
+        current = shifted[:, width - step:2 * width - step]
+        discrepancy = blocks[:, step].copy()
+        if step:
+            discrepancy += np.einsum('ij,ij->i', connection[:, 1:step + 1], blocks[:, step - 1::-1])
+        rows = np.flatnonzero(discrepancy & 1)
+        if rows.size == 0:
+            continue
+
+        previous = connection[rows]
+        connection[rows] ^= current[rows]
+        grow_mask = 2 * complexity[rows] <= step
+        grow = rows[grow_mask]
+        complexity[grow] = step + 1 - complexity[grow]
+        # B(x) becomes the old C(x) with m = N, i.e. x^1 at the next step
+        current[grow] = previous[grow_mask]
+    return complexity
+
+
+@register_test("linear_complexity", min_bits=100000)
+def linear_complexity(bits: BitSequence, block_size: int = 500) -> float:
+    """Linear complexity test"""
+    num_blocks = len(bits) // block_size
+    blocks = bits.bits[:num_blocks * block_size].reshape(num_blocks, block_size)
+    complexity = linear_complexities(blocks)
+
+    sign = -1 if block_size % 2 else 1
+    mean = (block_size / 2 + (9 - sign) / 36
+            - (block_size / 3 + 2 / 9) / 2 ** block_size)
+    t = sign * (complexity - mean) + 2 / 9
+    classes = np.searchsorted([-2.5, -1.5, -0.5, 0.5, 1.5, 2.5], t, side='left')
+
+    probabilities = np.array([0.010417, 0.03125, 0.125, 0.5, 0.25, 0.0625, 0.020833])
+    observed = np.bincount(classes, minlength=7)
+    expected = num_blocks * probabilities
+    chi_squared = np.sum((observed - expected) ** 2 / expected)
+    return igamc(3, chi_squared / 2)
+
+
+def pattern_counts(bits: np.ndarray, m: int) -> List[np.ndarray]:
+    """Cyclic pattern counts for block lengths m, m-1, ..., 0
+
+    Counts for shorter patterns are marginalised from the longest ones, since
+    each cyclic (m-1)-bit window is the prefix of the m-bit window at the
+    same position.
+    """
+    counts = [np.bincount(sliding_windows(bits, m, cyclic=True), minlength=1 << m)]
+    for _ in range(m):
+        longer = counts[-1]
+        counts.append(longer[0::2] + longer[1::2])
+    return counts
+
+
+@register_test("serial", min_bits=128)
+def serial(bits: BitSequence, m: Optional[int] = None) -> List[float]:
+    """Serial test (two p-values)"""
+    n = len(bits)
+    m = m or min(16, int(np.log2(n)) - 3)
+    counts = pattern_counts(bits.bits, m)
+
+    def psi_squared(k: int) -> float:
+        if k <= 0:
+            return 0.0
+        c = counts[m - k].astype(np.float64)
+        return float(2 ** k / n * np.sum(c * c) - n)
+
+    psi_m, psi_m1, psi_m2 = psi_squared(m), psi_squared(m - 1), psi_squared(m - 2)
+    delta1 = psi_m - psi_m1
+    delta2 = psi_m - 2 * psi_m1 + psi_m2
+    return [igamc(2 ** (m - 2), delta1 / 2), igamc(2 ** (m - 3), delta2 / 2)]
+
+
+@register_test("approximate_entropy", min_bits=128)
+def approximate_entropy(bits: BitSequence, m: Optional[int] = None) -> float:
+    """Approximate entropy test"""
+    n = len(bits)
+    m = m or min(10, int(np.log2(n)) - 6)
+    counts = pattern_counts(bits.bits, m + 1)
+
+    def phi(k: int) -> float:
+        c = counts[m + 1 - k]
+        c = c[c > 0] / n
+        return float(np.sum(c * np.log(c)))
+
+    ap_en = phi(m) - phi(m + 1)
+    chi_squared = 2 * n * (np.log(2) - ap_en)
+    return igamc(2 ** (m - 1), chi_squared / 2)
+
+
+def _cusum_p_value(z: float, n: int) -> float:
+    sqrt_n = np.sqrt(n)
+    k = np.arange(int((-n / z + 1) / 4), int((n / z - 1) / 4) + 1)
+    sum1 = np.sum(stats.norm.cdf((4 * k + 1) * z / sqrt_n) - stats.norm.cdf((4 * k - 1) * z / sqrt_n))
+    k = np.arange(int((-n / z - 3) / 4), int((n / z - 1) / 4) + 1)
+    sum2 = np.sum(stats.norm.cdf((4 * k + 3) * z / sqrt_n) - stats.norm.cdf((4 * k + 1) * z / sqrt_n))
+    return float(1 - sum1 + sum2)
+
+
+@register_test("cumulative_sums", min_bits=100)
+def cumulative_sums(bits: BitSequence) -> List[float]:
+    """Cumulative sums test (forward and backward)"""
+    n = len(bits)
+    x = 2 * bits.bits.astype(np.int64) - 1
+    forward = np.max(np.abs(np.cumsum(x)))
+    backward = np.max(np.abs(np.cumsum(x[::-1])))
+    return [_cusum_p_value(forward, n), _cusum_p_value(backward, n)]
+
+
+def _random_walk_cycles(bits: BitSequence):
+    """Random walk S_k, the cycle each step belongs to and the cycle count J"""
+    n = len(bits)
+    walk = np.cumsum(2 * bits.bits.astype(np.int64) - 1)
+    zeros = walk == 0
+    cycle_ids = np.concatenate([[0], np.cumsum(zeros)[:-1]])
+    num_cycles = int(zeros.sum()) + (1 if walk[-1] != 0 else 0)
+
+    if num_cycles < max(0.005 * np.sqrt(n), 500):
+        raise TestNotApplicable(f"only {num_cycles} cycles (need 500)")
+    return walk, cycle_ids, num_cycles
+
+
+@register_test("random_excursions", min_bits=1000000)
+def random_excursions(bits: BitSequence) -> List[float]:
+    """Random excursions test for states -4..-1, 1..4"""
+    walk, cycle_ids, num_cycles = _random_walk_cycles(bits)
+    states = np.array([-4, -3, -2, -1, 1, 2, 3, 4])
+
+    in_range = (np.abs(walk) <= 4) & (walk != 0)
+    state_index = np.searchsorted(states, walk[in_range])
+    visits = np.bincount(cycle_ids[in_range] * len(states) + state_index,
+                         minlength=num_cycles * len(states)).reshape(num_cycles, len(states))
+
+    p_values = []
+    for column, x in enumerate(states):
+        nu = np.bincount(np.minimum(visits[:, column], 5), minlength=6)
+        a = 1 / (2 * abs(x))
+        pi = np.array([1 - a] + [a * a * (1 - a) ** (k - 1) for k in range(1, 5)] + [a * (1 - a) ** 4])
+        expected = num_cycles * pi
+        chi_squared = np.sum((nu - expected) ** 2 / expected)
+        p_values.append(igamc(5 / 2, chi_squared / 2))
+    return p_values
+
+
+@register_test("random_excursions_variant", min_bits=1000000)
+def random_excursions_variant(bits: BitSequence) -> List[float]:
+    """Random excursions variant test for states -9..-1, 1..9"""
+    walk, _, num_cycles = _random_walk_cycles(bits)
+    states = np.array([x for x in range(-9, 10) if x != 0])
+    totals = np.bincount(walk[np.abs(walk) <= 9] + 9, minlength=19)[states + 9]
+    return special.erfc(np.abs(totals - num_cycles)
+                        / np.sqrt(2 * num_cycles * (4 * np.abs(states) - 2))).tolist()
+
+
+def run_battery(
+    sequence,
+    tests: Optional[Iterable[str]] = None,
+    alpha: float = 0.01,
+) -> Dict[str, Dict]:
+    """Run registered tests on a sequence, skipping those that do not apply
+
+    ``sequence`` may be a BitSequence or a list/array of 64-bit integers.
+    Tests that produce several p-values report all of them under
+    ``p_values``, their minimum under ``p_value``, and pass when the share of
+    passing p-values meets the SP 800-22 proportion bound.
+    """
+    bits = BitSequence.coerce(sequence)
+    names = list(tests) if tests is not None else list(TEST_REGISTRY)
+
+    results = {}
+    for name in names:
+        test = TEST_REGISTRY[name]
+        if not test.applies_to(len(bits)):
+            results[name] = {"skipped": f"needs at least {test.min_bits} bits", "min_bits": test.min_bits}
+            continue
+        try:
+            p = test.func(bits)
+        except TestNotApplicable as e:
+            results[name] = {"skipped": str(e), "min_bits": test.min_bits}
+            continue
+
+        p_values = [float(v) for v in p] if isinstance(p, list) else [float(p)]
+        result = {"p_value": min(p_values), "passed": proportion_passes(p_values, alpha)}
+        if len(p_values) > 1:
+            result["p_values"] = p_values
+        results[name] = result
+    return results
@@ -0,0 +1,139 @@
+"""
+Content-addressed cache of validation results
+
+The frontend often re-submits the same ICP batch (e.g. the last N values of
+``get_random_history``). Results are keyed by a hash of the input array and
+the test configuration, so an identical submission is answered without
+re-running any test. Entries live in a size-bounded LRU in memory and, when a
+directory is configured, as one JSON file per key on disk, so they survive
+restarts; the disk copy is bounded the same way, oldest files first.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+
+def result_key(values: np.ndarray, **config) -> str:
+    """Hash of the input values and test configuration"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(values, dtype="<u8").tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU of JSON-serializable results with optional disk copy"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, directory: Optional[str] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        # key -> (value, size), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            data = self._read(key)
+            if data is None:
+                self.misses += 1
+                return None
+            value = json.loads(data)
+            self._store(key, value, len(data))
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+
+    def put(self, key: str, value: Dict):
+        data = json.dumps(value)
+        with self._lock:
+            self._store(key, value, len(data))
+            self._write(key, data)
+
+    def _store(self, key: str, value: Dict, size: int):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # Touch so disk eviction also follows recency of use
+        os.utime(self._path(key))
+        return data
+
+    def _write(self, key: str, data: str):
+        if not self.directory:
+            return
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+            if self.directory:
+                files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+                stats.update(
+                    directory=self.directory,
+                    disk_hits=self.disk_hits,
+                    disk_entries=len(files),
+                    disk_bytes=sum(entry.stat().st_size for entry in files),
+                )
+            return stats